@@ -6,7 +6,8 @@ from django.contrib import admin
 from django.db.models import Q
 from django.utils import timezone
 
-from .models import Choice, Election, Statement, Question, Voter, Votetaker
+from .models import (
+    Choice, Election, Statement, Suppression, Question, Voter, Votetaker)
 from .settings import RECENT_DAYS
 
 
@@ -179,11 +180,12 @@ class VoterAdmin(admin.ModelAdmin):
     search_fields = ("email", "name", "posting_address")
     fields = (
         "election", "email", "name", "posting_address", "accepted", "notes",
-        "creation_date", "vote_date", "comments", "email_headers"
+        "creation_date", "vote_date", "bounce_count", "last_bounce",
+        "comments", "email_headers"
     )
     readonly_fields = (
-        "election", "email", "creation_date", "vote_date", "comments",
-        "email_headers"
+        "election", "email", "creation_date", "vote_date", "bounce_count",
+        "last_bounce", "comments", "email_headers"
     )
 
     def has_module_permission(self, request):
@@ -223,3 +225,13 @@ class VoterAdmin(admin.ModelAdmin):
                         election__cfv_end_date__lte=recent,
                         election__result_date__lte=recent)
         return qs
+
+
+@admin.register(Suppression)
+class SuppressionAdmin(admin.ModelAdmin):
+    """Suppression admin class."""
+    list_display = ("email", "creation_date", "reason")
+    search_fields = ("email",)
+
+    def has_module_permission(self, request):
+        return is_votetaker(request.user)
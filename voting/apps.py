@@ -0,0 +1,13 @@
+"""voting app configuration."""
+
+from django.apps import AppConfig
+
+
+class VotingConfig(AppConfig):
+    """voting app configuration."""
+    name = "voting"
+    default_auto_field = "django.db.models.AutoField"
+
+    def ready(self):
+        # pylint: disable=import-outside-toplevel,unused-import
+        from . import signals  # noqa: F401
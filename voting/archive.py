@@ -0,0 +1,174 @@
+"""Packed archives of old news articles."""
+
+from email.parser import BytesHeaderParser
+import mailbox
+import mmap
+import os
+import tarfile
+
+
+INDEX_SUFFIX = ".idx"
+DATA_SUFFIX = ".dat"
+
+
+def _normalise(article):
+    """Return article bytes with CRLF line endings converted to LF."""
+    return article.replace(b"\r\n", b"\n")
+
+
+def _header_msgid(article):
+    """Return the Message-ID from an article's headers, or None."""
+    msgid = BytesHeaderParser().parsebytes(article)["message-id"]
+    return str(msgid).strip() if msgid else None
+
+
+def _named_article(name, article):
+    """
+    Return (msgid, article) for an article stored in a file. Files named
+    after the Message-ID without the angle brackets, plus ".txt", as in the
+    old-articles directory, use that Message-ID; otherwise it is read from
+    the article's headers. Returns None if there is no Message-ID.
+    """
+    name = os.path.basename(name)
+    msgid = ("<" + name[:-4] + ">" if name.endswith(".txt")
+             else _header_msgid(article))
+    return (msgid, article) if msgid else None
+
+
+def directory_articles(path):
+    """Yield (msgid, article bytes) for each article file in a directory."""
+    for name in sorted(os.listdir(path)):
+        filename = os.path.join(path, name)
+        if not os.path.isfile(filename):
+            continue
+        with open(filename, "rb") as articlef:
+            article = _named_article(name, articlef.read())
+        if article:
+            yield article
+
+
+def mbox_articles(path):
+    """Yield (msgid, article bytes) for each message in an mbox file."""
+    box = mailbox.mbox(path, create=False)
+    try:
+        for key in box.iterkeys():
+            article = box.get_bytes(key)
+            msgid = _header_msgid(article)
+            if msgid:
+                yield msgid, article
+    finally:
+        box.close()
+
+
+def tar_articles(path):
+    """Yield (msgid, article bytes) for each article file in a tarball."""
+    with tarfile.open(path) as tar:
+        for member in tar:
+            if not member.isfile():
+                continue
+            article = _named_article(
+                member.name, tar.extractfile(member).read())
+            if article:
+                yield article
+
+
+def source_articles(path):
+    """
+    Yield (msgid, article bytes) from a directory, tarball or mbox file,
+    depending on what path is.
+    """
+    if os.path.isdir(path):
+        return directory_articles(path)
+    if tarfile.is_tarfile(path):
+        return tar_articles(path)
+    return mbox_articles(path)
+
+
+def build(path, articles):
+    """
+    Write a packed archive of (msgid, article bytes) pairs to path plus
+    INDEX_SUFFIX and DATA_SUFFIX. The data file holds the articles one
+    after another, and the index has a line of "msgid offset length" for
+    each. If a Message-ID appears more than once, the first article is kept.
+    Returns the number of articles written.
+    """
+    seen = set()
+    offset = 0
+    try:
+        with open(path + DATA_SUFFIX + ".new", "wb") as dataf, \
+                open(path + INDEX_SUFFIX + ".new", "w",
+                     encoding="ascii") as indexf:
+            for msgid, article in articles:
+                if msgid in seen:
+                    continue
+                seen.add(msgid)
+                article = _normalise(article)
+                dataf.write(article)
+                indexf.write("{} {} {}\n".format(msgid, offset, len(article)))
+                offset += len(article)
+    except BaseException:
+        for suffix in (DATA_SUFFIX, INDEX_SUFFIX):
+            try:
+                os.remove(path + suffix + ".new")
+            except FileNotFoundError:
+                pass
+        raise
+    os.replace(path + DATA_SUFFIX + ".new", path + DATA_SUFFIX)
+    os.replace(path + INDEX_SUFFIX + ".new", path + INDEX_SUFFIX)
+    return len(seen)
+
+
+class Archive:
+    """
+    A packed archive of news articles, opened read-only. The data file is
+    memory-mapped, and articles are returned as memoryview slices of it, so
+    nothing is copied until the caller decodes them.
+    """
+
+    def __init__(self, path):
+        self.index = {}
+        with open(path + INDEX_SUFFIX, encoding="ascii") as indexf:
+            for line in indexf:
+                msgid, offset, length = line.split()
+                self.index[msgid] = (int(offset), int(length))
+        with open(path + DATA_SUFFIX, "rb") as dataf:
+            if os.fstat(dataf.fileno()).st_size:
+                self.data = mmap.mmap(
+                    dataf.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                self.data = b""
+        self.view = memoryview(self.data)
+
+    @classmethod
+    def open(cls, path):
+        """Return the Archive at path, or None if there is not one."""
+        try:
+            return cls(path)
+        except FileNotFoundError:
+            return None
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, msgid):
+        return msgid in self.index
+
+    def get(self, msgid):
+        """Return a memoryview of an article's bytes, or None."""
+        try:
+            offset, length = self.index[msgid]
+        except KeyError:
+            return None
+        return self.view[offset:offset + length]
+
+    def close(self):
+        """Close the archive. Any views returned by get() must be released."""
+        self.view.release()
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
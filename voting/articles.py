@@ -0,0 +1,74 @@
+"""Parsed news articles, cached for the result and statement pages."""
+
+from collections import OrderedDict
+import email
+import hashlib
+import threading
+
+from . import settings
+
+
+def parse_article(text):
+    """
+    Parse the text of a news article, and return (headers, body) where
+    headers is a dictionary of the first value of each header, keyed by
+    lower-cased name.
+    """
+    message = email.message_from_string(text)
+    headers = {}
+    for name, value in message.items():
+        headers.setdefault(name.lower(), value)
+    return headers, message.get_payload()
+
+
+class ArticleCache:
+    """
+    A size-bounded LRU cache of parsed articles. Entries are keyed by the
+    object the article belongs to and also record a hash of its text, so
+    that if the text changes (including in another process) the stale entry
+    is replaced rather than returned.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key, text):
+        """Return the parsed (headers, body) of the article text for key."""
+        digest = hashlib.sha256(
+            text.encode("utf-8", "surrogatepass")).digest()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and entry[0] == digest:
+                self.entries.move_to_end(key)
+                return entry[1]
+        parsed = parse_article(text)
+        if self.maxsize:
+            with self.lock:
+                self.entries[key] = (digest, parsed)
+                self.entries.move_to_end(key)
+                while len(self.entries) > self.maxsize:
+                    self.entries.popitem(last=False)
+        return parsed
+
+    def invalidate(self, key):
+        """Remove the entry for key, if there is one."""
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        """Remove all the entries."""
+        with self.lock:
+            self.entries.clear()
+
+
+cache = ArticleCache(settings.ARTICLE_CACHE_SIZE)
+
+
+def parsed_article(obj, field):
+    """
+    Return the parsed (headers, body) of the article stored in the given
+    field of a model instance, from the cache if possible.
+    """
+    return cache.get((type(obj).__name__, obj.pk, field), getattr(obj, field))
@@ -0,0 +1,70 @@
+"""voting ballot bundles."""
+
+from array import array
+from collections import Counter
+import sys
+
+
+def pack_ranking(choice_ids):
+    """Return a ranking of choice ids packed into bytes."""
+    packed = array("I", choice_ids)
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def unpack_ranking(packed):
+    """Return the list of choice ids from a packed ranking."""
+    ranking = array("I")
+    ranking.frombytes(packed)
+    if sys.byteorder == "big":
+        ranking.byteswap()
+    return ranking.tolist()
+
+
+class Ballots:
+    """
+    The ranked ballots cast for a question, with identical rankings bundled.
+    Choices are referred to by their index into `choices`. Each distinct
+    ranking is stored once in the flat `rankings` array, with
+    `rankings[offsets[n]:offsets[n + 1]]` being the ranking of bundle n and
+    `weights[n]` the number of ballots that cast it. Nothing here touches the
+    database, so instances are cheap to pickle and ship to other processes.
+    """
+
+    def __init__(self, choices):
+        self.choices = list(choices)
+        self.rankings = array("H")
+        self.offsets = array("I", (0,))
+        self.weights = array("I")
+
+    @classmethod
+    def from_rankings(cls, choices, rankings):
+        """
+        Return the Ballots for an iterable of rankings, each of which is a
+        sequence of choice indexes in order of preference.
+        """
+        ballots = cls(choices)
+        for ranking, weight in Counter(map(tuple, rankings)).items():
+            ballots.add(ranking, weight)
+        return ballots
+
+    def add(self, ranking, weight=1):
+        """Add a bundle of `weight` ballots with the given ranking."""
+        self.rankings.extend(ranking)
+        self.offsets.append(len(self.rankings))
+        self.weights.append(weight)
+
+    def __len__(self):
+        return len(self.weights)
+
+    def __iter__(self):
+        """Yield (ranking, weight) for each bundle."""
+        rankings = self.rankings
+        offsets = self.offsets
+        for bundle, weight in enumerate(self.weights):
+            yield rankings[offsets[bundle]:offsets[bundle + 1]], weight
+
+    def total(self):
+        """Return the total number of ballots."""
+        return sum(self.weights)
@@ -0,0 +1,108 @@
+"""
+Caching of the public list pages, which change only a few times a week.
+Each cached response depends on one or more groups of models, and each
+group has a version number that is part of the cache key. Saving or
+deleting a model (see signals.py) increments its group's version, so
+every page that depends on it is regenerated on its next request. The
+VOTETAKERS group also covers changes to the votetakers' users.
+With more than one server process, the default cache must be shared
+between them (e.g. memcached or Redis) for this to reach every process.
+"""
+
+from functools import wraps
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+
+from . import settings
+
+
+ELECTIONS = "elections"
+STATEMENTS = "statements"
+VOTETAKERS = "votetakers"
+
+
+def _version_key(group):
+    """Return the cache key of a group's version number."""
+    return "voting:version:" + group
+
+
+def invalidate(*groups):
+    """
+    Invalidate the cached pages that depend on the given groups, once the
+    current transaction (if any) has been committed, so that the pages are
+    not regenerated from the old data in the meantime.
+    """
+    def increment():
+        for group in groups:
+            try:
+                cache.incr(_version_key(group))
+            except ValueError:
+                cache.set(_version_key(group), time.time_ns(), None)
+    transaction.on_commit(increment)
+
+
+def _versions(groups):
+    """
+    Return the current version numbers of the given groups. A missing
+    version (e.g. evicted from the cache) is started from the current time,
+    so that it cannot match the key of an older cached page.
+    """
+    keys = [_version_key(group) for group in groups]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns(), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def cached_view(*groups, params=(), dated=None):
+    """
+    Decorator to cache a view's GET responses until a model in one of the
+    given groups changes. The cache key includes the values of the named
+    query parameters; if dated is given, it is a function returning the
+    date the page's content depends on, which is also included in the key,
+    and the response is cached for at most VOTING_VIEW_CACHE_DATED_TIMEOUT
+    seconds. Conditional requests are answered from the cached response's
+    validators.
+    """
+    timeout = (settings.VIEW_CACHE_DATED_TIMEOUT if dated
+               else settings.VIEW_CACHE_TIMEOUT)
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return view(request, *args, **kwargs)
+            parts = [view.__module__, view.__qualname__, request.path]
+            parts.extend(
+                "{}={!r}".format(param, request.GET.getlist(param))
+                for param in params)
+            parts.extend(_versions(groups))
+            if dated:
+                parts.append(dated())
+            key = "voting:view:" + hashlib.sha256(
+                "\0".join(str(part) for part in parts).encode("utf-8")
+            ).hexdigest()
+            response = cache.get(key)
+            if response is not None:
+                return get_conditional_response(
+                    request, etag=response.get("ETag"),
+                    last_modified=parse_http_date_safe(
+                        response.get("Last-Modified", "")),
+                    response=response)
+            response = view(request, *args, **kwargs)
+            if response.status_code == 200 and not response.streaming:
+                if hasattr(response, "render") and not response.is_rendered:
+                    response.add_post_render_callback(
+                        lambda rendered: cache.set(key, rendered, timeout))
+                else:
+                    cache.set(key, response, timeout)
+            return response
+        return wrapper
+    return decorator
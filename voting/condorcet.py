@@ -0,0 +1,109 @@
+"""Condorcet counting, using the Schulze (strongest path) method."""
+
+
+def pairwise_matrix(ballots):
+    """
+    Return the pairwise preference matrix for the given Ballots.
+    `matrix[i][j]` is the number of voters who ranked choice i above choice
+    j. Choices that a voter did not rank are treated as equal last.
+    Each bundle of identical ballots is accumulated once, by its weight.
+    """
+    size = len(ballots.choices)
+    matrix = [[0] * size for _ in range(size)]
+    everyone = frozenset(range(size))
+    for ranking, weight in ballots:
+        below = set(everyone)
+        for winner in ranking:
+            below.discard(winner)
+            row = matrix[winner]
+            for loser in below:
+                row[loser] += weight
+    return matrix
+
+
+def strongest_paths(matrix):
+    """
+    Return the strengths of the strongest paths between each pair of
+    choices, given the pairwise preference matrix.
+    """
+    size = len(matrix)
+    paths = [
+        [matrix[i][j] if matrix[i][j] > matrix[j][i] else 0
+         for j in range(size)]
+        for i in range(size)
+    ]
+    for k in range(size):
+        row_k = paths[k]
+        for i in range(size):
+            strength_ik = paths[i][k]
+            if i == k or not strength_ik:
+                continue
+            row_i = paths[i]
+            for j in range(size):
+                if j in (i, k):
+                    continue
+                strength = min(strength_ik, row_k[j])
+                if strength > row_i[j]:
+                    row_i[j] = strength
+    return paths
+
+
+class Result:
+    """The result of a Condorcet count."""
+
+    def __init__(self, ballots):
+        self.choices = ballots.choices
+        self.ballots = ballots.total()
+        self.matrix = pairwise_matrix(ballots)
+        self.paths = strongest_paths(self.matrix)
+
+    def beats(self, i, j):
+        """Return True if choice i beats choice j by strongest path."""
+        return self.paths[i][j] > self.paths[j][i]
+
+    def ranking(self):
+        """
+        Return the overall ranking, as a list of lists of tied choice
+        indexes, best first.
+        """
+        size = len(self.choices)
+        wins = {}
+        for i in range(size):
+            wins.setdefault(
+                sum(1 for j in range(size) if self.beats(i, j)), []
+            ).append(i)
+        return [wins[count] for count in sorted(wins, reverse=True)]
+
+    def winners(self):
+        """Return the list of winning choice indexes."""
+        ranking = self.ranking()
+        return ranking[0] if ranking else []
+
+    def __str__(self):
+        size = len(self.choices)
+        lines = ["Ballots: {}".format(self.ballots), ""]
+        lines.extend(
+            "{:>3}: {}".format(i + 1, choice)
+            for i, choice in enumerate(self.choices)
+        )
+        for title, table in (("Pairwise preferences", self.matrix),
+                             ("Strongest paths", self.paths)):
+            lines.extend(("", title + ":",
+                          "     " + "".join(
+                              "{:>7}".format(j + 1) for j in range(size))))
+            lines.extend(
+                "{:>3}  ".format(i + 1) + "".join(
+                    "{:>7}".format("-" if i == j else table[i][j])
+                    for j in range(size))
+                for i in range(size)
+            )
+        lines.extend(("", "Ranking:"))
+        for position, tied in enumerate(self.ranking(), 1):
+            lines.append("{:>3}. {}".format(
+                position, " = ".join(self.choices[i] for i in tied)))
+        return "\n".join(lines)
+
+
+def count(ballots):
+    """Count the given Ballots and return the Result."""
+    return Result(ballots)
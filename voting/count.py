@@ -0,0 +1,215 @@
+"""voting vote counting."""
+
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import groupby
+
+from django.db.models import Count
+
+from . import condorcet, stv
+from .ballots import Ballots, unpack_ranking
+from .models import Ballot, Choice, Question, QuestionTotals, Vote
+
+
+RANKED = (Question.CONDORCET, Question.STV)
+
+
+def _bundle(choices, votes):
+    """
+    Return the Ballots for the given list of (choice_id, choice) and the
+    (voter_id, choice_id) rows of the votes, ordered by voter.
+    A voter's Vote rows are taken in the order they were recorded, which is
+    their order of preference.
+    """
+    index = {choice_id: n for n, (choice_id, _) in enumerate(choices)}
+    rankings = []
+    for _, rows in groupby(votes, lambda row: row[0]):
+        ranking = []
+        for _, choice_id in rows:
+            if index[choice_id] not in ranking:
+                ranking.append(index[choice_id])
+        rankings.append(ranking)
+    return Ballots.from_rankings((choice for _, choice in choices), rankings)
+
+
+def _bundle_packed(choices, packed):
+    """
+    Return the Ballots for the given list of (choice_id, choice) and the
+    packed rankings from Ballot rows. Identical packed rankings are grouped
+    before they are unpacked. Returns None if a ranking includes a choice
+    that does not exist, as then the Ballot rows are out of date.
+    """
+    index = {choice_id: n for n, (choice_id, _) in enumerate(choices)}
+    ballots = Ballots(choice for _, choice in choices)
+    for ranking, weight in Counter(bytes(ranking) for ranking in packed
+                                   ).items():
+        try:
+            ballots.add([index[choice_id]
+                         for choice_id in unpack_ranking(ranking)], weight)
+        except KeyError:
+            return None
+    return ballots
+
+
+def _packed_questions(ballots, votes):
+    """
+    Return the set of ids of the questions whose Ballot rows can be counted
+    instead of their Vote rows, given querysets of the accepted voters'
+    Ballots and Votes. That is those with Ballots from the same number of
+    voters as have Votes; if they differ (e.g. if some Votes were written
+    without the Ballots being repacked) the Vote rows, which are the
+    authoritative record, are counted.
+    """
+    voters = dict(votes.values("choice__question_id").annotate(
+        voters=Count("voter_id", distinct=True)).values_list(
+            "choice__question_id", "voters"))
+    return {
+        question_id for question_id, count in ballots.values(
+            "question_id").annotate(count=Count("id")).values_list(
+                "question_id", "count")
+        if voters.get(question_id) == count
+    }
+
+
+def load_ballots(question):
+    """
+    Return the Ballots cast by accepted voters for the given question, from
+    its Ballot rows if they are complete and up to date, or otherwise from
+    its Vote rows.
+    """
+    choices = list(question.choice_set.order_by("id").values_list(
+        "id", "choice"))
+    ballots = Ballot.objects.filter(question=question, voter__accepted=True)
+    if _packed_questions(ballots, Vote.objects.filter(
+            choice__question=question, voter__accepted=True)):
+        packed = _bundle_packed(choices, ballots.values_list(
+            "ranking", flat=True).iterator())
+        if packed is not None:
+            return packed
+    votes = Vote.objects.filter(
+        choice__question=question, voter__accepted=True
+    ).order_by("voter_id", "id").values_list("voter_id", "choice_id")
+    return _bundle(choices, votes)
+
+
+def load_election_ballots(election):
+    """
+    Return a dictionary mapping question ids to the Ballots cast by accepted
+    voters, for all the ranked questions in the given election. The packed
+    Ballot rows are read with a single query, and the Vote rows for any
+    questions that have no complete and up to date set of Ballot rows with
+    one more.
+    """
+    choices = {}
+    for question_id, rows in groupby(
+            Choice.objects.filter(
+                question__election=election, question__method__in=RANKED
+            ).order_by("question_id", "id").values_list(
+                "question_id", "id", "choice"),
+            lambda row: row[0]):
+        choices[question_id] = [row[1:] for row in rows]
+    ballots = {question_id: Ballots(choice for _, choice in question_choices)
+               for question_id, question_choices in choices.items()}
+    packed = _packed_questions(
+        Ballot.objects.filter(
+            question__election=election, question__method__in=RANKED,
+            voter__accepted=True),
+        Vote.objects.filter(
+            choice__question__election=election,
+            choice__question__method__in=RANKED, voter__accepted=True))
+    stale = set()
+    for question_id, rows in groupby(
+            Ballot.objects.filter(
+                question__in=packed, voter__accepted=True
+            ).order_by("question_id").values_list(
+                "question_id", "ranking").iterator(),
+            lambda row: row[0]):
+        bundled = _bundle_packed(
+            choices[question_id], (row[1] for row in rows))
+        if bundled is None:
+            stale.add(question_id)
+        else:
+            ballots[question_id] = bundled
+    packed -= stale
+    if packed.issuperset(choices):
+        return ballots
+    votes = Vote.objects.filter(
+        choice__question__election=election,
+        choice__question__method__in=RANKED,
+        voter__accepted=True,
+    ).exclude(choice__question__in=packed).order_by(
+        "choice__question_id", "voter_id", "id").values_list(
+            "choice__question_id", "voter_id", "choice_id")
+    for question_id, rows in groupby(votes, lambda row: row[0]):
+        ballots[question_id] = _bundle(
+            choices[question_id], (row[1:] for row in rows))
+    return ballots
+
+
+def _counter(method, seats):
+    """Return the function and extra arguments to count a method."""
+    if method == Question.CONDORCET:
+        return condorcet.count, ()
+    if method == Question.STV:
+        return stv.count, (seats,)
+    raise ValueError("Questions of type {!r} cannot be counted".format(
+        dict(Question._meta.get_field("method").choices).get(method, method)))
+
+
+def count_ballots(method, ballots, seats=1):
+    """Count the given Ballots using the given Question.method."""
+    function, args = _counter(method, seats)
+    return function(ballots, *args)
+
+
+def count_question(question):
+    """Count the votes for the given question and return the result."""
+    if question.method == Question.YESNO:
+        return question.choice_totals()
+    return count_ballots(
+        question.method, load_ballots(question), question.seats)
+
+
+def count_election(election, provisional=False, jobs=1):
+    """
+    Count the votes for every question in the given election. Returns a list
+    of (question, result) in question order, where result is None for
+    questions that cannot be counted. The yes/no questions are all counted
+    together with a single aggregate query, or from the running Tally if
+    provisional is True. If jobs is not 1 then the ranked questions are
+    counted in parallel by a pool of that many worker processes (or one per
+    CPU if jobs is None), each being sent only the ballots for its question.
+    """
+    totals = {result.question.id: result
+              for result in election.choice_totals(
+                  Question.YESNO, provisional)}
+    questions = list(election.question_set.all())
+    ballots = load_election_ballots(election)
+    for question in questions:
+        if question.method in RANKED:
+            # questions with no choices have no entry
+            ballots.setdefault(question.id, Ballots(()))
+    results = {}
+    executor = ProcessPoolExecutor(jobs) if jobs != 1 else None
+    try:
+        for question in questions:
+            if question.method == Question.YESNO:
+                results[question.id] = totals.get(
+                    question.id, QuestionTotals(question, []))
+            elif question.method in RANKED:
+                function, args = _counter(question.method, question.seats)
+                if executor:
+                    results[question.id] = executor.submit(
+                        function, ballots[question.id], *args)
+                else:
+                    results[question.id] = function(
+                        ballots[question.id], *args)
+    finally:
+        if executor:
+            executor.shutdown()
+    return [
+        (question, results[question.id].result()
+         if executor and question.method in RANKED
+         else results.get(question.id))
+        for question in questions
+    ]
@@ -0,0 +1,152 @@
+"""
+Discovery of CFV and result postings in the announcement newsgroup.
+Rather than votetakers copying Message-IDs into the admin by hand, the
+overview of each new range of articles in the group is fetched with one
+OVER command, and postings whose subject names an election (and whose
+sender is one of its votetakers) fill in the election's Message-IDs.
+"""
+
+from email.utils import parseaddr, parsedate_to_datetime
+import nntplib
+import re
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Election, NewsGroup
+from . import cache, settings
+
+
+CFV_RE = re.compile(r"""
+    ^\s*
+    (?:(?:\d+(?:st|nd|rd|th)|last|final)\s+)?
+    (?:cfv|call\s+for\s+votes)
+    \s*:\s*(.*)$
+    """, re.IGNORECASE | re.VERBOSE)
+RESULT_RE = re.compile(r"^\s*results?\s*:\s*(.*)$", re.IGNORECASE)
+NEWSGROUP_RE = re.compile(r"[a-z0-9+_-]+(?:\.[a-z0-9+_-]+)+")
+
+
+def _normalise(text):
+    """Return text case-folded and with whitespace collapsed."""
+    return " ".join(text.casefold().split())
+
+
+def classify(subject):
+    """
+    Return ("cfv" or "result", title) if subject is that of a CFV or result
+    posting, or None otherwise.
+    """
+    for kind, regexp in (("cfv", CFV_RE), ("result", RESULT_RE)):
+        match = regexp.match(subject)
+        if match:
+            return kind, _normalise(match.group(1))
+    return None
+
+
+def election_senders(election):
+    """Return the set of lower-cased addresses of an election's votetakers."""
+    senders = set()
+    for votetaker in (election.votetaker, election.secondary):
+        if votetaker:
+            senders.update(
+                email.lower() for email in (votetaker.public_email,
+                                            votetaker.user.email) if email)
+    return senders
+
+
+def match_election(elections, title, sender):
+    """
+    Return the one election of those given whose title matches a posting's
+    subject title, and whose votetakers include the sender (if the election
+    has any votetaker addresses), or None if there is not exactly one.
+    The titles match if the election's title appears in the subject as
+    whole words, if the subject contains the election's short name as a
+    word, or if both name the same newsgroups.
+    """
+    groups = set(NEWSGROUP_RE.findall(title))
+    matches = []
+    for election in elections:
+        election_title = _normalise(election.title)
+        if (re.search(r"(?<!\S){}(?!\S)".format(re.escape(election_title)),
+                      title)
+                or (election.shortname and election.shortname.casefold()
+                    in title.split())
+                or (groups and groups == set(
+                    NEWSGROUP_RE.findall(election_title)))):
+            matches.append(election)
+    matches = [
+        election for election in matches
+        if sender in election_senders(election)
+        or not election_senders(election)
+    ]
+    return matches[0] if len(matches) == 1 else None
+
+
+def discover(conn, group=None, limit=None):
+    """
+    Scan the articles in the announcement group that have arrived since the
+    last scan, using one OVER command on the NNTP connection conn, for up
+    to `limit` articles. Fills in the CFV and result Message-IDs (and result
+    dates) of elections that do not have them yet, and returns a list of
+    (election, "cfv" or "result", msgid) for each one filled in. Postings
+    whose Message-ID is not valid are ignored.
+    """
+    group = group or settings.ANNOUNCE_GROUP
+    limit = limit or settings.DISCOVERY_LIMIT
+    state = NewsGroup.objects.get_or_create(name=group)[0]
+    _, _, first, last, _ = conn.group(group)
+    start = max(state.high_water + 1, first)
+    end = min(last, start + limit - 1)
+    found = []
+    if start <= end:
+        try:
+            _, overviews = conn.over((start, end))
+        except nntplib.NNTPTemporaryError as exc:
+            # 423: no articles in the range, e.g. if they have all expired
+            if not exc.response.startswith("423"):
+                raise
+            overviews = []
+        elections = list(Election.objects.filter(
+            Q(cfv_msgid="") | Q(result_msgid=""),
+            uk_vote=True, hidden=False,
+        ).exclude(status=Election.ABANDONED).select_related(
+            "votetaker__user", "secondary__user"))
+        for _, fields in overviews:
+            posting = classify(nntplib.decode_header(fields["subject"]))
+            if not posting:
+                continue
+            kind, title = posting
+            field = kind + "_msgid"
+            msgid = fields["message-id"].strip()
+            try:
+                Election._meta.get_field(field).run_validators(msgid)
+            except ValidationError:
+                continue
+            election = match_election(
+                [election for election in elections
+                 if not getattr(election, field)],
+                title, parseaddr(fields["from"])[1].lower())
+            if election:
+                setattr(election, field, msgid)
+                found.append((election, kind, msgid))
+                if kind == "result" and not election.result_date:
+                    try:
+                        election.result_date = parsedate_to_datetime(
+                            fields["date"]).date()
+                    except (TypeError, ValueError):
+                        pass
+    with transaction.atomic():
+        for election, kind, msgid in found:
+            updates = {kind + "_msgid": msgid, "modified": timezone.now()}
+            if kind == "result":
+                updates["result_date"] = election.result_date
+            Election.objects.filter(pk=election.pk).update(**updates)
+        if found:
+            cache.invalidate(cache.ELECTIONS)
+        state.high_water = max(state.high_water, end)
+        state.last_scan = timezone.now()
+        state.save()
+    return found
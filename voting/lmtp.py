@@ -0,0 +1,295 @@
+"""
+LMTP server for vote-related email.
+This lets the MTA deliver many messages to one long-running process,
+instead of starting a new votingemail process for every message. The
+local part of each recipient address is the short name of the election,
+and the domain determines the type of email (see VOTING_LMTP_DOMAINS;
+domains not listed there receive ballot requests).
+"""
+
+import logging
+import os
+import socket
+import socketserver
+
+from django.db import close_old_connections
+
+from . import mail, settings
+
+
+MAX_LINE_LENGTH = 1000
+MAX_DATA_LINE_LENGTH = 64 * 1024
+MAX_MESSAGE_SIZE = 10 * 1024 * 1024
+IDLE_TIMEOUT = 300
+
+STATUS_REPLIES = {
+    os.EX_NOUSER: "550 5.1.1",
+    os.EX_DATAERR: "550 5.6.0",
+}
+
+logger = logging.getLogger(__name__)
+
+
+def parse_path(arg, keyword):
+    """
+    Return the address from a 'FROM:<address>' or 'TO:<address>' argument,
+    or None if it is malformed.
+    """
+    if not arg.upper().startswith(keyword + ":"):
+        return None
+    path = arg[len(keyword) + 1:].strip()
+    if not path.startswith("<") or ">" not in path:
+        return None
+    return path[1:path.index(">")]
+
+
+def parse_recipient(address):
+    """Return (email type, election name) for a recipient address."""
+    local, _, domain = address.rpartition("@")
+    return (settings.LMTP_DOMAINS.get(domain.lower(), "request"),
+            local.split("+", 1)[0])
+
+
+class LMTPHandler(socketserver.StreamRequestHandler):
+    """Handle one LMTP session."""
+    timeout = IDLE_TIMEOUT
+
+    def setup(self):
+        super().setup()
+        self.sender = None
+        self.recipients = []
+
+    def reply(self, *lines):
+        """Send a (possibly multi-line) reply to the client."""
+        for n, line in enumerate(lines, 1):
+            if n < len(lines):
+                line = line[:3] + "-" + line[4:]
+            self.wfile.write(line.encode("utf-8", "replace") + b"\r\n")
+        self.wfile.flush()
+
+    def read_line(self, limit):
+        """
+        Read a whole line of at most limit bytes, including the line ending.
+        Returns b"" at the end of the input, or None if the line is longer
+        than limit, in which case the rest of it is read and discarded.
+        """
+        line = self.rfile.readline(limit + 1)
+        if len(line) <= limit:
+            return line
+        while line and not line.endswith(b"\n"):
+            line = self.rfile.readline(limit)
+        return None
+
+    def handle(self):
+        self.reply("220 {} LMTP voting ready".format(socket.getfqdn()))
+        try:
+            while True:
+                line = self.read_line(MAX_LINE_LENGTH)
+                if line is None:
+                    self.reply("500 5.5.2 Line too long")
+                    continue
+                if not line:
+                    return
+                command, _, arg = line.decode(
+                    "ascii", "replace").rstrip("\r\n").partition(" ")
+                method = getattr(self, "lmtp_" + command.upper(), None)
+                if method is None:
+                    self.reply("500 5.5.1 Command not recognised")
+                elif method(arg.strip()) is False:
+                    return
+        except socket.timeout:
+            logger.info("Closing idle LMTP session from %s",
+                        self.client_address)
+            try:
+                self.reply("421 4.4.2 Idle timeout, closing connection")
+            except OSError:
+                pass
+
+    def lmtp_LHLO(self, arg):
+        """Handle the LHLO command."""
+        # pylint: disable=invalid-name,unused-argument
+        self.sender = None
+        self.recipients = []
+        self.reply("250 " + socket.getfqdn(), "250 PIPELINING",
+                   "250 ENHANCEDSTATUSCODES", "250 8BITMIME",
+                   "250 SIZE {}".format(MAX_MESSAGE_SIZE))
+
+    def lmtp_MAIL(self, arg):
+        """Handle the MAIL command."""
+        # pylint: disable=invalid-name
+        if self.sender is not None:
+            self.reply("503 5.5.1 Sender already specified")
+            return
+        sender = parse_path(arg, "FROM")
+        if sender is None:
+            self.reply("501 5.5.4 Syntax: MAIL FROM:<address>")
+            return
+        self.sender = sender
+        self.reply("250 2.1.0 OK")
+
+    def lmtp_RCPT(self, arg):
+        """Handle the RCPT command."""
+        # pylint: disable=invalid-name
+        if self.sender is None:
+            self.reply("503 5.5.1 Need MAIL command first")
+            return
+        recipient = parse_path(arg, "TO")
+        if not recipient:
+            self.reply("501 5.5.4 Syntax: RCPT TO:<address>")
+            return
+        close_old_connections()
+        try:
+            mail.find_election(parse_recipient(recipient)[1])
+        except mail.MailError as exc:
+            self.reply("{} {}".format(
+                STATUS_REPLIES.get(exc.status, "550 5.1.1"), exc.message))
+            return
+        self.recipients.append(recipient)
+        self.reply("250 2.1.5 OK")
+
+    def lmtp_DATA(self, arg):
+        """Handle the DATA command, replying once for each recipient."""
+        # pylint: disable=invalid-name,unused-argument
+        if not self.recipients:
+            self.reply("503 5.5.1 Need RCPT command first")
+            return
+        self.reply("354 End data with <CR><LF>.<CR><LF>")
+        lines = []
+        size = 0
+        too_long = False
+        while True:
+            line = self.read_line(MAX_DATA_LINE_LENGTH)
+            if line is None:
+                too_long = True
+                continue
+            if not line:
+                return
+            if line in (b".\r\n", b".\n"):
+                break
+            if line.startswith(b"."):
+                line = line[1:]
+            size += len(line)
+            if size <= MAX_MESSAGE_SIZE and not too_long:
+                lines.append(line.replace(b"\r\n", b"\n"))
+        raw_msg = b"".join(lines)
+        for recipient in self.recipients:
+            if too_long:
+                self.reply("500 5.5.2 Line too long")
+            elif size > MAX_MESSAGE_SIZE:
+                self.reply("552 5.3.4 Message too big")
+            else:
+                self.reply(self.deliver(recipient, raw_msg))
+        self.sender = None
+        self.recipients = []
+
+    def deliver(self, recipient, raw_msg):
+        """Process the message for one recipient and return the reply."""
+        email_type, election_name = parse_recipient(recipient)
+        if email_type == "bounce":
+            raw_msg = "X-Original-To: {}\n".format(recipient).encode(
+                "utf-8") + raw_msg
+        close_old_connections()
+        try:
+            mail.handle(email_type, election_name, self.sender, raw_msg)
+        except mail.MailError as exc:
+            return "{} {}".format(
+                STATUS_REPLIES.get(exc.status, "451 4.3.0"), exc.message)
+        except Exception:  # pylint: disable=broad-except
+            logger.exception("Error handling email for %s", recipient)
+            return "451 4.3.0 Temporary failure, please try again later"
+        return "250 2.0.0 OK"
+
+    def lmtp_RSET(self, arg):
+        """Handle the RSET command."""
+        # pylint: disable=invalid-name,unused-argument
+        self.sender = None
+        self.recipients = []
+        self.reply("250 2.0.0 OK")
+
+    def lmtp_NOOP(self, arg):
+        """Handle the NOOP command."""
+        # pylint: disable=invalid-name,unused-argument
+        self.reply("250 2.0.0 OK")
+
+    def lmtp_VRFY(self, arg):
+        """Handle the VRFY command."""
+        # pylint: disable=invalid-name,unused-argument
+        self.reply("252 2.5.0 Cannot verify")
+
+    def lmtp_QUIT(self, arg):
+        """Handle the QUIT command."""
+        # pylint: disable=invalid-name,unused-argument
+        self.reply("221 2.0.0 Bye")
+        return False
+
+
+class LMTPServer(socketserver.TCPServer):
+    """
+    An LMTP server listening on a TCP port. Sessions are handled one at a
+    time, so the process keeps a single database connection open for all
+    of them, and idle sessions are closed after IDLE_TIMEOUT seconds so that
+    a stalled client cannot hold up the others.
+    """
+    allow_reuse_address = True
+
+    def __init__(self, address):
+        super().__init__(address, LMTPHandler)
+
+
+class UnixLMTPServer(socketserver.UnixStreamServer):
+    """An LMTP server listening on a Unix domain socket."""
+
+    def __init__(self, path):
+        if os.path.exists(path):
+            os.unlink(path)
+        super().__init__(path, LMTPHandler)
+
+
+def deliver(address, sender, recipients, raw_msg, timeout=60):
+    """
+    Deliver a message to an LMTP server at address (a (host, port) tuple or
+    a Unix socket path). Returns a list of (recipient, reply) pairs.
+    """
+    if isinstance(address, str):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(timeout)
+        sock.connect(address)
+    else:
+        sock = socket.create_connection(address, timeout)
+    with sock, sock.makefile("rb") as rfile:
+
+        def command(line):
+            """Send a command line (if any) and return the reply."""
+            if line is not None:
+                sock.sendall(line.encode("utf-8") + b"\r\n")
+            reply = []
+            while True:
+                text = rfile.readline(MAX_LINE_LENGTH).decode(
+                    "utf-8", "replace").rstrip("\r\n")
+                reply.append(text)
+                if len(text) < 4 or text[3] != "-":
+                    return "\n".join(reply)
+
+        replies = []
+        command(None)
+        command("LHLO " + socket.getfqdn())
+        command("MAIL FROM:<{}>".format(sender))
+        accepted = []
+        for recipient in recipients:
+            reply = command("RCPT TO:<{}>".format(recipient))
+            if reply.startswith("2"):
+                accepted.append(recipient)
+            else:
+                replies.append((recipient, reply))
+        if accepted and command("DATA").startswith("3"):
+            data = b"".join(
+                b"." + line if line.startswith(b".") else line
+                for line in raw_msg.replace(b"\r\n", b"\n").replace(
+                    b"\n", b"\r\n").splitlines(True))
+            if not data.endswith(b"\r\n"):
+                data += b"\r\n"
+            sock.sendall(data + b".\r\n")
+            replies.extend((recipient, command(None))
+                           for recipient in accepted)
+        command("QUIT")
+    return replies
@@ -0,0 +1,385 @@
+"""voting email handling."""
+
+from email import message_from_bytes
+from email.utils import formataddr, parseaddr
+import logging
+import os
+import re
+from uuid import UUID
+
+from django.core.exceptions import ValidationError
+from django.core.mail import EmailMessage
+from django.core.validators import EmailValidator
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Lower
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+from . import mailqueue, settings
+from .models import Blob, Election, Suppression, Voter
+
+
+KEY_RE = re.compile(
+    rb"[0-9a-fA-F]{8}-(?:[0-9a-fA-F]{4}-){3}[0-9a-fA-F]{12}")
+MAX_KEY_SCAN = 1024 * 1024
+MAX_KEYS = 20
+VERP_RE = re.compile(r"\+(([0-9]+)-[0-9a-f]{16})@")
+PERMANENT_STATUS_RE = re.compile(r"5\.\d{1,3}\.\d{1,3}\b")
+
+logger = logging.getLogger(__name__)
+
+
+class MailError(Exception):
+    """
+    An error to be reported back to the sender of an email. `status` is the
+    sysexits.h exit status describing the error.
+    """
+
+    def __init__(self, message, status):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def find_election(name):
+    """Return the election with the given short name, or raise MailError."""
+    election = Election.objects.filter(shortname__iexact=name).first()
+    if not election:
+        raise MailError(
+            "Sorry, that election could not be found.", os.EX_NOUSER)
+    if not election.ballot_email:
+        raise MailError(
+            "Sorry, that election is not using ballots-by-email.",
+            os.EX_NOUSER)
+    return election
+
+
+def check_accepting_votes(election):
+    """Raise MailError if the election is not currently accepting votes."""
+    if not election.accepting_votes():
+        raise MailError(
+            "Sorry, that election is not currently accepting votes.",
+            os.EX_NOUSER)
+
+
+def request_recipient(msg, sender):
+    """Return the address a ballot paper has been requested for."""
+    recipient = ""
+    if msg["subject"]:
+        for word in msg["subject"].split():
+            try:
+                EmailValidator()(word)
+                recipient = word
+                break
+            except ValidationError:
+                pass
+    if msg["reply-to"] and not recipient:
+        recipient = parseaddr(msg["reply-to"])[1]
+    if msg["from"] and not recipient:
+        recipient = parseaddr(msg["from"])[1]
+    return recipient or sender
+
+
+def vote_keys(raw_msg, msg):
+    """
+    Return the list of distinct possible voter keys found in a vote email,
+    in the order they appear. Only the first MAX_KEY_SCAN bytes of the raw
+    message are scanned, followed by the decoded text parts up to a further
+    MAX_KEY_SCAN bytes in total, and at most MAX_KEYS keys are returned, so
+    that a huge message cannot make this expensive.
+    """
+    keys = dict.fromkeys(
+        match.group() for match in KEY_RE.finditer(raw_msg, 0, MAX_KEY_SCAN))
+    budget = MAX_KEY_SCAN
+    for part in msg.walk():
+        if len(keys) >= MAX_KEYS or budget <= 0:
+            break
+        if part.is_multipart() or part.get_content_maintype() != "text":
+            continue
+        payload = part.get_payload()
+        if not isinstance(payload, str) or len(payload) > budget:
+            continue
+        decoded = part.get_payload(decode=True)
+        budget -= len(decoded)
+        keys.update(dict.fromkeys(
+            match.group() for match in KEY_RE.finditer(decoded)))
+    return [UUID(key.decode("ascii")) for key in list(keys)[:MAX_KEYS]]
+
+
+def bounce_token(voter_id):
+    """
+    Return the token identifying a voter in the envelope sender of their
+    ballot paper: the voter's id and a truncated HMAC of it. Unlike the
+    voter's key it is not secret, so it can safely appear in mail logs,
+    but it cannot be forged to make another voter's address bounce.
+    """
+    return "{}-{}".format(voter_id, salted_hmac(
+        "voting.mail.bounce_token", str(voter_id)).hexdigest()[:16])
+
+
+def ballot_paper(election, voter, recipient=None):
+    """
+    Return the EmailMessage containing a voter's ballot paper, to be sent to
+    recipient (by default, the voter's email address). The envelope sender
+    includes the voter's bounce token, so that bounces can be traced to the
+    voter.
+    """
+    recipient = recipient or voter.email
+    return EmailMessage(
+        subject="Ballot paper for election: " + election.title,
+        body=(election.proposal.replace("$KEY$", str(voter.key)).
+              replace("$FROM$", recipient).
+              replace("\r", "")),
+        from_email="{}+{}@bounce.ukvoting.org.uk".format(
+            election.shortname, bounce_token(voter.pk)),
+        to=(recipient,),
+        reply_to=("{}@vote.ukvoting.org.uk".format(election.shortname),),
+        headers={
+            "From": "UKVoting Autoresponder <{}@bounce.ukvoting.org.uk>".
+                    format(election.shortname),
+        },
+    )
+
+
+def get_or_create_voters(election, recipients, create=True):
+    """
+    Return a dictionary, keyed by lower-cased email address, of the Voters
+    for an election with the given addresses, fetched with a single query.
+    recipients is a dictionary mapping lower-cased addresses to tuples of
+    (email address, email headers); if create is True, any missing Voters
+    are first created with bulk_create.
+    """
+    voters = election.voter_set.annotate(
+        email_lower=Lower("email")).filter(email_lower__in=recipients)
+    if create:
+        missing = set(recipients).difference(
+            voters.values_list("email_lower", flat=True))
+        if missing:
+            blobs = Blob.store_many(
+                {recipients[email][1] for email in missing})
+            Voter.objects.bulk_create(
+                (Voter(election=election, email=recipients[email][0],
+                       email_headers_blob=blobs[recipients[email][1]])
+                 for email in missing),
+                ignore_conflicts=True)
+    return {voter.email_lower: voter for voter in voters}
+
+
+def handle_request(election, sender, raw_msg, voters=None):
+    """
+    Handle an email requesting a ballot paper. voters, if provided, is a
+    dictionary of already-fetched Voters keyed by lower-cased email address.
+    """
+    check_accepting_votes(election)
+    msg = message_from_bytes(raw_msg)
+    recipient = request_recipient(msg, sender)
+    if Suppression.suppressed((recipient,)):
+        raise MailError(
+            "Sorry, ballot papers cannot be sent to {} because previous"
+            " email to it has bounced.".format(recipient), os.EX_NOUSER)
+    voter = (voters or {}).get(recipient.lower())
+    if voter is None:
+        voter = Voter.objects.get_or_create(
+            election=election,
+            email__iexact=recipient,
+            defaults={
+                "email": recipient,
+                "email_headers": msg.as_string().split("\n\n", 1)[0],
+            }
+        )[0]
+    mailqueue.send(ballot_paper(election, voter, recipient))
+
+
+def handle_vote(election, sender, raw_msg, voters=None):
+    """
+    Handle an email containing a filled ballot paper. voters, if provided,
+    is a dictionary of already-fetched Voters keyed by voter key.
+    """
+    check_accepting_votes(election)
+    msg = message_from_bytes(raw_msg)
+    keys = vote_keys(raw_msg, msg)
+    if voters is None:
+        voters = {voter.key: voter for voter in election.voter_set.filter(
+            key__in=keys)} if keys else {}
+    voter = next((voters[key] for key in keys if key in voters), None)
+    if not voter:
+        raise MailError(
+            "Sorry, but we could not find your voter key in your email.",
+            os.EX_DATAERR)
+    mailqueue.send(EmailMessage(
+        subject="Voting paper for election: " + election.title,
+        body="Sender: {}\nVoting key: {}\nVoter: {}".format(
+            sender, voter.key, voter.email),
+        from_email=formataddr((msg["from"] or "None",
+                               "bounce@ukvoting.org.uk")),
+        to=election.ballot_email,
+        attachments=(
+            (None, msg, "message/rfc822"),
+        ),
+    ))
+    voter.vote_date = timezone.now()
+    voter.save()
+    voter.vote_emails.create(email=msg.as_string())
+
+
+def bounce_report(msg):
+    """
+    Return a list of (recipient, status) for the failed recipients listed
+    in a delivery status notification, or None if msg is not one.
+    """
+    for part in msg.walk():
+        if part.get_content_type() != "message/delivery-status":
+            continue
+        failed = []
+        for block in part.get_payload():
+            if (block["action"] or "").strip().lower() != "failed":
+                continue
+            recipient = block["final-recipient"] or block[
+                "original-recipient"] or ""
+            failed.append((recipient.split(";", 1)[-1].strip(),
+                           (block["status"] or "").strip()))
+        return failed
+    return None
+
+
+def handle_bounce(election, sender, raw_msg, voters=None):
+    """
+    Handle an email bouncing a ballot paper. The voter is identified by the
+    bounce token in the VERP envelope recipient (found in the X-Original-To,
+    Delivered-To or To header), or by the failed recipients in a delivery
+    status notification. Only delivery status notifications reporting a
+    failure are acted on; anything else sent to the bounce address (such as
+    an out-of-office reply) is logged and ignored. Each failure is counted
+    against the voter, and the address is suppressed if the status is a
+    permanent (5.x.x) one or it has failed VOTING_BOUNCE_LIMIT times.
+    """
+    # pylint: disable=unused-argument
+    msg = message_from_bytes(raw_msg)
+    report = bounce_report(msg)
+    if report is None:
+        logger.info(
+            "Ignoring message to bounce address for %s that is not a"
+            " delivery status notification (Auto-Submitted: %s)",
+            election.shortname, msg["auto-submitted"] or "none")
+        return
+    if not report:
+        return
+    voter_ids = {
+        int(match.group(2))
+        for header in ("x-original-to", "delivered-to", "to")
+        for value in msg.get_all(header, ())
+        for match in VERP_RE.finditer(str(value))
+        if constant_time_compare(
+            match.group(1), bounce_token(int(match.group(2))))
+    }
+    bounced = set(election.voter_set.filter(
+        pk__in=voter_ids)) if voter_ids else set()
+    if not bounced:
+        bounced.update(get_or_create_voters(
+            election, {recipient.lower(): None for recipient, _ in report},
+            create=False).values())
+    permanent = any(PERMANENT_STATUS_RE.match(status)
+                    for _, status in report)
+    reason = ", ".join(status or "failed" for _, status in report)
+    for voter in bounced:
+        Voter.objects.filter(pk=voter.pk).update(
+            bounce_count=F("bounce_count") + 1, last_bounce=timezone.now())
+        if permanent or voter.bounce_count + 1 >= settings.BOUNCE_LIMIT:
+            Suppression.suppress(voter.email, reason)
+
+
+HANDLERS = {
+    "request": handle_request,
+    "vote": handle_vote,
+    "bounce": handle_bounce,
+}
+
+
+def handle(email_type, election_name, sender, raw_msg):
+    """
+    Handle an email of the given type ("request", "vote" or "bounce") for
+    the named election. Raises MailError if it cannot be processed.
+    """
+    HANDLERS[email_type](find_election(election_name), sender, raw_msg)
+
+
+def prefetch_voters(email_type, election, messages):
+    """
+    Return a dictionary of the Voters that a batch of (sender, raw_msg)
+    messages of the given type refer to, fetched with grouped queries, in
+    the form expected by the handler's voters argument. For ballot
+    requests, any missing Voters are created first.
+    """
+    if email_type == "request":
+        recipients = {}
+        for sender, raw_msg in messages:
+            msg = message_from_bytes(raw_msg)
+            recipient = request_recipient(msg, sender)
+            recipients.setdefault(recipient.lower(), (
+                recipient, msg.as_string().split("\n\n", 1)[0]))
+        return get_or_create_voters(
+            election, recipients, election.accepting_votes())
+    if email_type == "vote":
+        keys = set()
+        for _, raw_msg in messages:
+            keys.update(vote_keys(raw_msg, message_from_bytes(raw_msg)))
+        return {voter.key: voter for voter in election.voter_set.filter(
+            key__in=keys)}
+    return None
+
+
+def handle_batch(email_type, election_name, messages):
+    """
+    Handle a batch of (sender, raw_msg) emails of the given type for the
+    named election, in one transaction with grouped voter lookups.
+    Returns a list with an entry for each message, which is None if it was
+    handled successfully or otherwise the exception it raised. Each message
+    is handled in its own savepoint, so a failure only rolls back that
+    message's changes.
+    """
+    try:
+        election = find_election(election_name)
+    except MailError as exc:
+        return [exc] * len(messages)
+    results = []
+    with transaction.atomic():
+        voters = prefetch_voters(email_type, election, messages)
+        for sender, raw_msg in messages:
+            try:
+                with transaction.atomic():
+                    HANDLERS[email_type](election, sender, raw_msg, voters)
+            except Exception as exc:  # pylint: disable=broad-except
+                results.append(exc)
+            else:
+                results.append(None)
+    return results
+
+
+def issue_ballots(election, addresses, skip_existing=False):
+    """
+    Issue ballot papers for an election to a list of email addresses,
+    creating any missing Voters in one transaction and sending all the
+    ballot papers over one mail connection (or queueing them together).
+    If skip_existing is True then addresses that already have a Voter are
+    not sent another ballot paper. Suppressed addresses are never sent
+    ballot papers. Returns the numbers of Voters created, ballot papers
+    sent, and suppressed addresses.
+    """
+    recipients = {}
+    for address in addresses:
+        EmailValidator()(address)
+        recipients.setdefault(address.lower(), (address, ""))
+    with transaction.atomic():
+        existing = set(get_or_create_voters(election, recipients, False))
+        voters = get_or_create_voters(election, recipients)
+    suppressed = {email.lower() for email in Suppression.suppressed(
+        voter.email for voter in voters.values())}
+    messages = [
+        ballot_paper(election, voter)
+        for email, voter in sorted(voters.items())
+        if not (skip_existing and email in existing)
+        and email not in suppressed
+    ]
+    mailqueue.send_many(messages)
+    return len(voters) - len(existing), len(messages), len(suppressed)
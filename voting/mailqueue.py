@@ -0,0 +1,119 @@
+"""voting outbound mail queue."""
+
+import datetime
+from email import message_from_bytes
+from email.message import Message
+
+from django.core.mail import EmailMessage, get_connection
+from django.core.mail.message import MIMEMixin
+from django.db import transaction
+from django.utils import timezone
+
+from . import settings
+from .models import OutgoingEmail
+
+
+class QueuedMIMEMessage(MIMEMixin, Message):
+    """A parsed queued message, which Django's mail backends can send."""
+
+
+class QueuedEmailMessage(EmailMessage):
+    """An EmailMessage whose content has already been rendered."""
+
+    def __init__(self, queued):
+        super().__init__(from_email=queued.from_email,
+                         to=queued.recipients.split("\n"))
+        self.raw_message = bytes(queued.message)
+
+    def message(self):
+        return message_from_bytes(self.raw_message, _class=QueuedMIMEMessage)
+
+
+def enqueue(email_message):
+    """Add an EmailMessage to the outbound mail queue."""
+    return OutgoingEmail.objects.create(
+        from_email=email_message.from_email,
+        recipients="\n".join(email_message.recipients()),
+        message=email_message.message().as_bytes(),
+    )
+
+
+def send(email_message):
+    """
+    Send an EmailMessage, via the outbound mail queue if VOTING_QUEUE_MAIL
+    is set, or otherwise immediately.
+    """
+    if settings.QUEUE_MAIL:
+        enqueue(email_message)
+    else:
+        email_message.send()
+
+
+def send_many(email_messages):
+    """
+    Send a list of EmailMessages, by adding them all to the outbound mail
+    queue in one transaction if VOTING_QUEUE_MAIL is set, or otherwise
+    immediately over a single mail connection.
+    """
+    if settings.QUEUE_MAIL:
+        with transaction.atomic():
+            for email_message in email_messages:
+                enqueue(email_message)
+    else:
+        get_connection().send_messages(email_messages)
+
+
+def retry_delay(attempts):
+    """Return the delay before retrying after the given number of attempts."""
+    return datetime.timedelta(
+        seconds=settings.MAIL_RETRY_DELAY * 2 ** (attempts - 1))
+
+
+def process_queue(limit=None):
+    """
+    Send the emails in the outbound queue that are due, all over a single
+    mail connection. Failed emails are retried with exponential backoff,
+    until VOTING_MAIL_MAX_ATTEMPTS attempts have been made. Returns the
+    numbers of emails sent and failed.
+    """
+    sent = failed = 0
+    connection = get_connection()
+    try:
+        due = OutgoingEmail.objects.filter(
+            next_attempt__lte=timezone.now()).values_list("id", flat=True)
+        for email_id in list(due[:limit] if limit else due):
+            with transaction.atomic():
+                queued = OutgoingEmail.objects.select_for_update(
+                    skip_locked=True).filter(id=email_id).first()
+                if queued is None:
+                    continue
+                try:
+                    connection.open()
+                    connection.send_messages([QueuedEmailMessage(queued)])
+                except Exception as exc:  # pylint: disable=broad-except
+                    failed += 1
+                    queued.attempts += 1
+                    queued.last_error = repr(exc)
+                    if queued.attempts >= settings.MAIL_MAX_ATTEMPTS:
+                        queued.next_attempt = None
+                    else:
+                        queued.next_attempt = timezone.now() + retry_delay(
+                            queued.attempts)
+                    queued.save()
+                    connection.close()
+                else:
+                    sent += 1
+                    queued.delete()
+    finally:
+        connection.close()
+    return sent, failed
+
+
+def queue_status():
+    """Return the numbers of emails due, deferred and abandoned."""
+    now = timezone.now()
+    return (
+        OutgoingEmail.objects.filter(next_attempt__lte=now).count(),
+        OutgoingEmail.objects.filter(next_attempt__gt=now).count(),
+        OutgoingEmail.objects.filter(next_attempt=None).count(),
+    )
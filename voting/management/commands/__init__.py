@@ -0,0 +1,18 @@
+"""voting management commands."""
+
+from django.core.management.base import CommandError
+
+from ...models import Election
+
+
+def get_election(key):
+    """
+    Return the election with the given id or short name, or raise
+    CommandError if there is none.
+    """
+    election = Election.objects.filter(
+        **({"id": int(key)} if key.isdigit() else {"shortname": key})
+    ).first()
+    if not election:
+        raise CommandError("Election {!r} not found".format(key))
+    return election
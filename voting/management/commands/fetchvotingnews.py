@@ -1,55 +1,161 @@
 """Import voting statements, cfvs and results from the NNTP server."""
 
-import nntplib
 import os
 
 from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
 
-from ...models import Election, Statement
-from ... import nntp
+from ...archive import Archive
+from ...discovery import discover
+from ...models import ArticleFetch, Election, Statement
+from ... import cache, nntp, pages, settings
+
+
+BATCH_SIZE = 100
 
 
 class Command(BaseCommand):
     """Import voting statements, cfvs and results from the NNTP server."""
     help = "Import voting statements, cfvs and results from the NNTP server."
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.batch_size = BATCH_SIZE
+        self.fetched = []
+        self.failed = []
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--connections", type=int, default=4,
+            help="The number of concurrent NNTP connections to use"
+            " (default: %(default)s)",
+        )
+        parser.add_argument(
+            "--force", action="store_true",
+            help="Retry articles that previously could not be fetched, even"
+            " if they are not yet due to be retried",
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=BATCH_SIZE,
+            help="The number of articles to save in each transaction"
+            " (default: %(default)s)",
+        )
+        parser.add_argument(
+            "--discover", action="store_true",
+            help="First scan the new articles in the announcement newsgroup"
+            " for CFVs and results, and fill in the Message-IDs of the"
+            " elections they are for",
+        )
+
     def handle(self, *args, **options):
-        conn = None
-        for statement in Statement.objects.filter(statement=""):
-            conn = conn or nntp.connect()
-            statement.statement = self.fetch_article(conn, statement.msgid)
-            if statement.statement:
-                statement.save()
-        for election in Election.objects.filter(cfv="").exclude(cfv_msgid=""):
-            conn = conn or nntp.connect()
-            election.cfv = self.fetch_article(conn, election.cfv_msgid)
-            if election.cfv:
-                election.save()
-        for election in Election.objects.filter(result="").exclude(
-                result_msgid=""):
-            conn = conn or nntp.connect()
-            election.result = self.fetch_article(conn, election.result_msgid)
-            if election.result:
-                election.save()
-
-    def fetch_article(self, conn, msgid):
-        """Fetch an article. Returns the article content, or ""."""
+        if options["discover"]:
+            conn = nntp.connect()
+            try:
+                for election, kind, msgid in discover(conn):
+                    self.stdout.write("Found {} {} for {}".format(
+                        kind, msgid, election))
+            finally:
+                conn.quit()
+        wanted = {}
+        for model, field, msgid_field, queryset in (
+            (Statement, "statement", "msgid",
+             Statement.objects.filter(statement="")),
+            (Election, "cfv", "cfv_msgid",
+             Election.objects.filter(cfv="").exclude(cfv_msgid="")),
+            (Election, "result", "result_msgid",
+             Election.objects.filter(result="").exclude(result_msgid="")),
+        ):
+            for pk, msgid in queryset.values_list(
+                    "pk", msgid_field).iterator():
+                wanted.setdefault(msgid, []).append((model, pk, field))
+        if not options["force"]:
+            deferred = ArticleFetch.deferred(wanted)
+            if deferred:
+                self.stdout.write("Skipping {} articles not yet due to be"
+                                  " retried.".format(len(deferred)))
+            for msgid in deferred:
+                del wanted[msgid]
+        self.batch_size = options["batch_size"]
+        remote = []
+        archive = Archive.open(settings.OLD_ARTICLES)
         try:
-            with open(os.path.join(os.path.dirname(__file__),
-                                   "..", "..", "..", "old-articles",
+            for msgid in wanted:
+                article = self.fetch_local_article(archive, msgid)
+                if article:
+                    self.save_article(msgid, wanted[msgid], article)
+                else:
+                    remote.append(msgid)
+        finally:
+            if archive:
+                archive.close()
+        for msgid, response, lines in nntp.fetch_articles(
+                remote, options["connections"]):
+            if lines is not None:
+                self.save_article(msgid, wanted[msgid],
+                                  b"\n".join(lines).decode("iso-8859-1"))
+                continue
+            if response.startswith(nntp.NO_SUCH_ARTICLE):
+                # only the server not having the article is backed off
+                self.failed.append((msgid, response))
+                if len(self.failed) >= self.batch_size:
+                    self.flush()
+            if not response.startswith("430"):
+                self.stdout.write(self.style.NOTICE(
+                    "Failed to fetch article {}: {!r}".format(
+                        msgid, response)))
+        self.flush()
+
+    def save_article(self, msgid, targets, article):
+        """
+        Queue an article to be stored in each of the given (model, pk,
+        field) targets, saving the queue if it has reached the batch size.
+        """
+        self.fetched.append((msgid, targets, article))
+        if len(self.fetched) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Save the queued articles and failed fetches in one transaction,
+        updating only the article fields, render the pages for any results
+        and statements, and invalidate the cached list pages.
+        """
+        with transaction.atomic():
+            for _, targets, article in self.fetched:
+                for model, pk, field in targets:
+                    model.objects.filter(pk=pk).update(
+                        **{field: article, "modified": timezone.now()})
+            ArticleFetch.fetched([msgid for msgid, _, _ in self.fetched])
+            for msgid, response in self.failed:
+                ArticleFetch.failed(msgid, response)
+            for _, targets, _ in self.fetched:
+                for model, pk, field in targets:
+                    if field == "result":
+                        pages.render_result(Election.objects.defer(
+                            "proposal", "cfv").get(pk=pk))
+                    elif field == "statement":
+                        pages.render_statement(Statement.objects.get(pk=pk))
+        if self.fetched:
+            cache.invalidate(cache.ELECTIONS, cache.STATEMENTS)
+        self.fetched = []
+        self.failed = []
+
+    def fetch_local_article(self, archive, msgid):
+        """
+        Fetch an article from the old-articles archive if there is one, or
+        otherwise the old-articles directory. Returns the content, or "".
+        """
+        if archive:
+            view = archive.get(msgid)
+            if view is None:
+                return ""
+            with view:
+                return str(view, "iso-8859-1")
+        try:
+            with open(os.path.join(settings.OLD_ARTICLES,
                                    msgid[1:-1] + ".txt"),
                       encoding="iso-8859-1") as articlef:
                 return articlef.read()
         except FileNotFoundError:
-            pass
-        try:
-            response, info = conn.article(msgid)
-            if response.startswith("220"):
-                return b"\n".join(info.lines).decode("iso-8859-1")
-            raise nntplib.NNTPError(response)
-        except nntplib.NNTPError as exc:
-            if not exc.response.startswith("430"):
-                self.stdout.write(self.style.NOTICE(
-                    "Failed to fetch article {}: {!r}".format(
-                        msgid, response)))
             return ""
@@ -0,0 +1,40 @@
+"""Build a packed archive of old news articles."""
+
+import mailbox
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ... import archive, settings
+
+
+class Command(BaseCommand):
+    """Build a packed archive of old news articles."""
+    help = (
+        "Build a packed archive of old news articles from a directory of"
+        " articles named after their Message-IDs, an mbox file or a tarball."
+        " fetchvotingnews reads articles from the archive in preference to"
+        " the old-articles directory."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "source",
+            help="The directory, mbox file or tarball to read articles from",
+        )
+        parser.add_argument(
+            "--output", default=settings.OLD_ARTICLES,
+            help="The path of the archive to write, without the {} and {}"
+            " suffixes (default: %(default)s)".format(
+                archive.INDEX_SUFFIX, archive.DATA_SUFFIX),
+        )
+
+    def handle(self, *args, **options):
+        try:
+            written = archive.build(
+                options["output"], archive.source_articles(options["source"]))
+        except (OSError, mailbox.Error) as exc:
+            raise CommandError(str(exc)) from exc
+        self.stdout.write(self.style.SUCCESS(
+            "Archived {} article(s) to {}{{{},{}}}".format(
+                written, options["output"], archive.INDEX_SUFFIX,
+                archive.DATA_SUFFIX)))
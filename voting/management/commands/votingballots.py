@@ -0,0 +1,34 @@
+"""Convert between Vote rows and packed Ballot rows for an election."""
+
+from django.core.management.base import BaseCommand
+
+from ...models import Ballot
+from . import get_election
+
+
+class Command(BaseCommand):
+    """Convert between Vote rows and packed Ballot rows for an election."""
+    help = "Convert between Vote rows and packed Ballot rows for an election."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "election", help="The short name or id of the election",
+        )
+        group = parser.add_mutually_exclusive_group(required=True)
+        group.add_argument(
+            "--pack", action="store_true",
+            help="Rebuild the Ballot rows from the Vote rows",
+        )
+        group.add_argument(
+            "--unpack", action="store_true",
+            help="Rebuild the Vote rows from the Ballot rows",
+        )
+
+    def handle(self, *args, **options):
+        election = get_election(options["election"])
+        if options["pack"]:
+            self.stdout.write(self.style.SUCCESS(
+                "Packed {} ballot(s)".format(Ballot.pack(election))))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                "Unpacked {} vote(s)".format(Ballot.unpack(election))))
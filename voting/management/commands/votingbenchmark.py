@@ -0,0 +1,163 @@
+"""Benchmark loading and counting votes using synthetic elections."""
+
+from itertools import islice
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from ...count import count_ballots, load_ballots
+from ...models import (
+    Ballot, Blob, Choice, Election, Question, Vote, Voter)
+
+
+BATCH_SIZE = 10000
+
+
+def batched(iterable, size=BATCH_SIZE):
+    """Yield lists of up to size items from the iterable."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def synthetic_rankings(rng, choices, ballots, ranked):
+    """
+    Yield synthetic rankings of choice indexes. Each choice is given a
+    popularity drawn from a long-tailed distribution, and each voter ranks
+    choices by weighted sampling without replacement, stopping after a
+    random number of preferences. Unranked questions get one choice each.
+    """
+    popularity = [rng.paretovariate(1.5) for _ in range(choices)]
+    for _ in range(ballots):
+        if not ranked:
+            yield rng.choices(range(choices), popularity)
+            continue
+        order = sorted(
+            range(choices),
+            key=lambda i: rng.random() ** (1 / popularity[i]),
+            reverse=True)
+        yield order[:rng.randint(1, choices)]
+
+
+class Command(BaseCommand):
+    """Benchmark loading and counting votes using synthetic elections."""
+    help = (
+        "Benchmark loading and counting votes using synthetic elections."
+        " For ranked methods, a second line marked '*' shows the time taken"
+        " to pack the votes into Ballot rows, and to load and count them."
+        " All the synthetic data is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--ballots", type=int, nargs="+", default=[1000, 10000],
+            help="The numbers of ballots to benchmark with",
+        )
+        parser.add_argument(
+            "--choices", type=int, nargs="+", default=[2, 12],
+            help="The numbers of choices to benchmark with",
+        )
+        parser.add_argument(
+            "--method", action="append",
+            choices=[method for method, _ in
+                     Question._meta.get_field("method").choices],
+            help="Only benchmark this method (may be repeated)",
+        )
+        parser.add_argument(
+            "--seed", type=int, default=0,
+            help="The seed for the random number generator",
+        )
+
+    def handle(self, *args, **options):
+        if min(options["choices"]) < 1:
+            raise CommandError("--choices must be at least 1")
+        if min(options["ballots"]) < 0:
+            raise CommandError("--ballots must not be negative")
+        rng = random.Random(options["seed"])
+        methods = options["method"] or [
+            method for method, _ in Question._meta.get_field("method").choices]
+        self.stdout.write("{:<10} {:>8} {:>7} {:>10} {:>10} {:>10}".format(
+            "method", "ballots", "choices", "generate", "load", "count"))
+        for method in methods:
+            for ballots in options["ballots"]:
+                for choices in options["choices"]:
+                    self.benchmark(rng, method, ballots, choices)
+
+    def benchmark(self, rng, method, ballots, choices):
+        """Benchmark one method at one size, rolling back the data after."""
+        with transaction.atomic():
+            start = time.perf_counter()
+            question = self.generate(rng, method, ballots, choices)
+            timings = [time.perf_counter() - start]
+            if method == Question.FREEFORM:
+                timings.extend((None, None))
+            elif method == Question.YESNO:
+                start = time.perf_counter()
+                question.choice_totals()
+                timings.extend((time.perf_counter() - start, 0.0))
+            else:
+                start = time.perf_counter()
+                loaded = load_ballots(question)
+                timings.append(time.perf_counter() - start)
+                start = time.perf_counter()
+                count_ballots(method, loaded, question.seats)
+                timings.append(time.perf_counter() - start)
+            self.report(method, ballots, choices, timings)
+            if method in (Question.CONDORCET, Question.STV):
+                start = time.perf_counter()
+                Ballot.pack(question.election)
+                timings = [time.perf_counter() - start]
+                start = time.perf_counter()
+                loaded = load_ballots(question)
+                timings.append(time.perf_counter() - start)
+                start = time.perf_counter()
+                count_ballots(method, loaded, question.seats)
+                timings.append(time.perf_counter() - start)
+                self.report(method + "*", ballots, choices, timings)
+            transaction.set_rollback(True)
+
+    def generate(self, rng, method, ballots, choices):
+        """Create a synthetic election and return its question."""
+        election = Election.objects.create(
+            title="Benchmark", votetype="Procedural", hidden=True,
+            status=Election.COUNT)
+        question = Question.objects.create(
+            election=election, question="Benchmark", method=method,
+            seats=max(1, choices // 4))
+        choice_ids = [
+            choice.id for choice in Choice.objects.bulk_create(
+                Choice(question=question, choice="Choice {}".format(n))
+                for n in range(choices))]
+        if not choice_ids[0]:
+            choice_ids = list(question.choice_set.order_by(
+                "id").values_list("id", flat=True))
+        no_headers = Blob.store("")
+        for batch in batched(range(ballots)):
+            Voter.objects.bulk_create(
+                Voter(election=election, accepted=True,
+                      email_headers_blob=no_headers,
+                      email="voter{}@example.com".format(n))
+                for n in batch)
+        voter_ids = list(Voter.objects.filter(election=election).order_by(
+            "id").values_list("id", flat=True))
+        rankings = synthetic_rankings(
+            rng, choices, ballots, method != Question.YESNO)
+        for batch in batched(
+                Vote(voter_id=voter_id, choice_id=choice_ids[index])
+                for voter_id, ranking in zip(voter_ids, rankings)
+                for index in ranking):
+            Vote.objects.bulk_create(batch)
+        return question
+
+    def report(self, method, ballots, choices, timings):
+        """Write a line of benchmark results."""
+        self.stdout.write("{:<10} {:>8} {:>7} {}".format(
+            method, ballots, choices, " ".join(
+                "{:>10}".format("n/a" if timing is None else
+                                "{:.3f}s".format(timing))
+                for timing in timings)))
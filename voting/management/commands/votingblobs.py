@@ -0,0 +1,20 @@
+"""Delete stored blobs that are no longer referred to."""
+
+from django.core.management.base import BaseCommand
+
+from ...models import Blob
+
+
+class Command(BaseCommand):
+    """Delete stored blobs that are no longer referred to."""
+    help = (
+        "Delete the stored email payloads (blobs) that nothing refers to any"
+        " more. Blobs are deleted when the objects using them are, so this"
+        " is only needed after they have been replaced, or deleted in ways"
+        " that send no signals (such as raw SQL)."
+    )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS(
+            "Deleted {} unreferenced blob(s)".format(
+                Blob.delete_unreferenced())))
@@ -0,0 +1,42 @@
+"""Count the votes for an election."""
+
+from django.core.management.base import BaseCommand
+
+from ...count import count_election
+from . import get_election
+
+
+class Command(BaseCommand):
+    """Count the votes for an election."""
+    help = "Count the votes for an election."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "election", help="The short name or id of the election",
+        )
+        parser.add_argument(
+            "--question", type=int, action="append",
+            help="Only show this question number (may be repeated)",
+        )
+        parser.add_argument(
+            "--provisional", action="store_true",
+            help="Read yes/no totals from the running tally",
+        )
+        parser.add_argument(
+            "--jobs", type=int, default=1,
+            help="Count questions in this many parallel processes"
+            " (0 for one per CPU)",
+        )
+
+    def handle(self, *args, **options):
+        election = get_election(options["election"])
+        for number, (question, result) in enumerate(
+                count_election(election, options["provisional"],
+                               options["jobs"] or None), 1):
+            if options["question"] and number not in options["question"]:
+                continue
+            if result is None:
+                result = "Questions of type {!r} cannot be counted.".format(
+                    question.get_method_display())
+            self.stdout.write("Question {}: {}\n\n{}\n\n".format(
+                number, question, result))
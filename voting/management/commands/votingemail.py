@@ -1,19 +1,22 @@
 """Receive a vote-related email, store and process it."""
 
-from email import message_from_bytes
-from email.utils import formataddr, parseaddr
+from email.utils import parseaddr
+import mailbox
 import os
-import re
 import sys
-from uuid import UUID
 
-from django.core.exceptions import ValidationError
-from django.core.mail import EmailMessage
-from django.core.management.base import BaseCommand
-from django.core.validators import EmailValidator
-from django.utils import timezone
+from django.core.management.base import BaseCommand, CommandError
 
-from ...models import Election, Voter
+from ... import mail
+
+
+def mailbox_sender(box, key):
+    """Return the envelope sender of a message in a Maildir or mbox."""
+    if isinstance(box, mailbox.mbox):
+        from_line = box.get_message(key).get_from().split()
+        if from_line:
+            return from_line[0]
+    return parseaddr(box.get(key)["return-path"] or "")[1]
 
 
 class Command(BaseCommand):
@@ -22,121 +25,88 @@ class Command(BaseCommand):
 
     def add_arguments(self, parser):
         parser.add_argument(
-            "--type", choices=("request", "vote", "bounce"),
+            "--type", choices=tuple(mail.HANDLERS),
             required=True, help="The type of email received",
         )
         parser.add_argument(
-            "--sender", required=True, help="The sender of the email",
+            "--sender",
+            help="The sender of the email (required unless reading a"
+            " Maildir or mbox, where the Return-Path is used)",
         )
         parser.add_argument(
             "--election", required=True,
             help="The election the email relates to",
         )
+        group = parser.add_mutually_exclusive_group()
+        group.add_argument(
+            "--maildir", metavar="PATH",
+            help="Process every message in this Maildir, moving each to its"
+            " 'done' or 'failed' folder",
+        )
+        group.add_argument(
+            "--mbox", metavar="PATH",
+            help="Process every message in this mbox, moving each to the"
+            " PATH.done or PATH.failed mbox",
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=100,
+            help="The number of messages to process in each transaction"
+            " when reading a Maildir or mbox (default: %(default)s)",
+        )
 
     def handle(self, *args, **options):
+        if options["maildir"] or options["mbox"]:
+            self.handle_mailbox(options)
+            return
+        if options["sender"] is None:
+            raise CommandError("--sender is required")
         raw_msg = sys.stdin.buffer.read()
-        election = Election.objects.filter(
-            shortname__iexact=options["election"]).first()
-        if not election:
-            self.stdout.write("Sorry, that election could not be found.\n")
-            sys.exit(os.EX_NOUSER)
-        if not election.ballot_email:
-            self.stdout.write(
-                "Sorry, that election is not using ballots-by-email.\n")
-            sys.exit(os.EX_NOUSER)
-        if options["type"] == "request":
-            self.handle_request(election, options["sender"], raw_msg)
-        elif options["type"] == "vote":
-            self.handle_vote(election, options["sender"], raw_msg)
-        elif options["type"] == "bounce":
-            self.handle_bounce(election, options["sender"], raw_msg)
-
-    def handle_request(self, election, sender, raw_msg):
-        """Handle an email requesting a ballot paper."""
-        today = timezone.now().date()
-        if (election.status != Election.ACTIVE or
-                not election.cfv_date or not election.cfv_end_date or
-                not election.cfv_date <= today <= election.cfv_end_date):
-            self.stdout.write(
-                "Sorry, that election is not currently accepting votes.\n")
-            sys.exit(os.EX_NOUSER)
-        msg = message_from_bytes(raw_msg)
-        recipient = ""
-        if msg["subject"]:
-            for word in msg["subject"].split():
-                try:
-                    EmailValidator()(word)
-                    recipient = word
-                    break
-                except ValidationError:
-                    pass
-        if msg["reply-to"] and not recipient:
-            recipient = parseaddr(msg["reply-to"])[1]
-        if msg["from"] and not recipient:
-            recipient = parseaddr(msg["from"])[1]
-        recipient = recipient or sender
-        voter = Voter.objects.get_or_create(
-            election=election,
-            email__iexact=recipient,
-            defaults={
-                "email": recipient,
-                "email_headers": msg.as_string().split("\n\n", 1)[0],
-            }
-        )[0]
-        EmailMessage(
-            subject="Ballot paper for election: " + election.title,
-            body=(election.proposal.replace("$KEY$", str(voter.key)).
-                  replace("$FROM$", recipient).
-                  replace("\r", "")),
-            from_email=("UKVoting Autoresponder <{}@bounce.ukvoting.org.uk>".
-                        format(election.shortname)),
-            to=(recipient,),
-            reply_to=("{}@vote.ukvoting.org.uk".format(election.shortname),),
-        ).send()
-
-    def handle_vote(self, election, sender, raw_msg):
-        """Handle an email containing a filled ballot paper."""
-        today = timezone.now().date()
-        if (election.status != Election.ACTIVE or
-                not election.cfv_date or not election.cfv_end_date or
-                not election.cfv_date <= today <= election.cfv_end_date):
-            self.stdout.write(
-                "Sorry, that election is not currently accepting votes.\n")
-            sys.exit(os.EX_NOUSER)
-        msg = message_from_bytes(raw_msg)
-        raw_decoded = b"\n".join(
-            part.get_payload(decode=True)
-            for part in msg.walk()
-            if not part.is_multipart()
-        )
-        voter = None
-        for secret in re.findall(
-                rb"[0-9a-fA-F]{8}-(?:[0-9a-fA-F]{4}-){3}[0-9a-fA-F]{12}",
-                raw_msg + b"\n" + raw_decoded):
-            voter = Voter.objects.filter(
-                election=election, key=UUID(secret.decode("ascii"))).first()
-            if voter:
-                break
-        if not voter:
-            self.stdout.write(
-                "Sorry, but we could not find your voter key"
-                " in your email.\n")
-            sys.exit(os.EX_DATAERR)
-        EmailMessage(
-            subject="Voting paper for election: " + election.title,
-            body="Sender: {}\nVoting key: {}\nVoter: {}".format(
-                sender, voter.key, voter.email),
-            from_email=formataddr((msg["from"] or "None",
-                                   "bounce@ukvoting.org.uk")),
-            to=election.ballot_email,
-            attachments=(
-                (None, msg, "message/rfc822"),
-            ),
-        ).send()
-        voter.vote_date = timezone.now()
-        voter.save()
-        voter.vote_emails.create(email=msg.as_string())
+        try:
+            mail.handle(options["type"], options["election"],
+                        options["sender"], raw_msg)
+        except mail.MailError as exc:
+            self.stdout.write(exc.message + "\n")
+            sys.exit(exc.status)
 
-    def handle_bounce(self, election, sender, raw_msg):
-        """Handle an email bouncing a ballot paper."""
-        pass
+    def handle_mailbox(self, options):
+        """Process all the messages in a Maildir or mbox, in batches."""
+        if options["maildir"]:
+            box = mailbox.Maildir(options["maildir"], factory=None,
+                                  create=False)
+            done = box.add_folder("done")
+            failed = box.add_folder("failed")
+        else:
+            if not os.path.exists(options["mbox"]):
+                raise CommandError("No such mbox: " + options["mbox"])
+            box = mailbox.mbox(options["mbox"], create=False)
+            done = mailbox.mbox(options["mbox"] + ".done")
+            failed = mailbox.mbox(options["mbox"] + ".failed")
+        counts = {True: 0, False: 0}
+        for folder in (box, done, failed):
+            folder.lock()
+        try:
+            keys = list(box.keys())
+            for start in range(0, len(keys), options["batch_size"]):
+                batch = keys[start:start + options["batch_size"]]
+                results = mail.handle_batch(
+                    options["type"], options["election"],
+                    [(mailbox_sender(box, key) if options["sender"] is None
+                      else options["sender"],
+                      box.get_bytes(key)) for key in batch])
+                for key, result in zip(batch, results):
+                    if result is not None:
+                        self.stdout.write(self.style.NOTICE(
+                            "{}: {}".format(key, getattr(
+                                result, "message", None) or repr(result))))
+                    folder = done if result is None else failed
+                    folder.add(box.get_message(key))
+                    box.remove(key)
+                    counts[result is None] += 1
+                for folder in (box, done, failed):
+                    folder.flush()
+        finally:
+            for folder in (box, done, failed):
+                folder.unlock()
+        self.stdout.write(self.style.SUCCESS(
+            "Processed {} message(s), {} failed".format(
+                counts[True] + counts[False], counts[False])))
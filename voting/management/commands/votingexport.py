@@ -0,0 +1,215 @@
+"""Export the public site as static files."""
+
+import gzip
+import hashlib
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from django.urls import URLPattern, get_resolver, resolve, reverse
+from django.views.generic.base import RedirectView
+
+from ...models import Election, Statement
+
+
+MANIFEST = ".manifest.json"
+REDIRECTS = "_redirects"
+
+PAGES = (
+    "voting:home", "voting:votetakers", "voting:statements", "voting:results",
+    "voting:missing", "voting:status", "voting:guidelines", "voting:pgpkeys",
+    "voting:resources",
+)
+
+EXTENSIONS = {
+    "text/html": ".html",
+    "text/plain": ".txt",
+}
+
+
+def page_urls():
+    """Yield the URL of each page of the public site."""
+    for name in PAGES:
+        yield reverse(name)
+    for statement in Statement.objects.only("release_date", "slug"):
+        yield statement.get_absolute_url()
+        yield statement.get_raw_url()
+    for election in Election.objects.filter(
+            status=Election.RESULT, hidden=False).only("id", "shortname"):
+        yield election.get_result_url()
+        yield election.get_raw_result_url()
+
+
+def redirects():
+    """
+    Yield (URL, target URL) for each legacy URL: the old *.php and *.html
+    pages, the Message-ID URLs for statements and results, and the numeric
+    URLs of results that have short names.
+    """
+    prefix = reverse("voting:home")
+    for pattern in get_resolver("voting.urls").url_patterns:
+        callback = getattr(pattern, "callback", None)
+        if (isinstance(pattern, URLPattern)
+                and getattr(callback, "view_class", None) is RedirectView
+                and not pattern.pattern.converters):
+            yield (prefix + str(pattern.pattern),
+                   reverse(callback.view_initkwargs["pattern_name"]))
+    for msgid, date, slug in Statement.objects.values_list(
+            "msgid", "release_date", "slug"):
+        target = Statement(release_date=date, slug=slug).get_raw_url()
+        for suffix in ("", ".txt"):
+            yield (reverse("voting:statements") + msgid[1:-1] + suffix,
+                   target)
+    for election in Election.objects.filter(
+            status=Election.RESULT, hidden=False).only(
+                "id", "shortname", "result_msgid"):
+        target = election.get_raw_result_url()
+        if election.result_msgid:
+            for suffix in ("", ".txt"):
+                yield (reverse("voting:results") +
+                       election.result_msgid[1:-1] + suffix, target)
+        if election.shortname:
+            yield (reverse("voting:result", kwargs={"key": election.id}),
+                   election.get_result_url())
+
+
+def file_path(url, content_type):
+    """
+    Return the path of the file, relative to the export directory, to
+    store the page at url in. Pages are stored with an extension for their
+    content type, and URLs ending in '/' as index files.
+    """
+    extension = EXTENSIONS.get(content_type.split(";")[0].strip(), "")
+    path = url.lstrip("/")
+    if not path or path.endswith("/"):
+        return path + "index" + extension
+    return path + extension
+
+
+class Command(BaseCommand):
+    """Export the public site as static files."""
+    help = (
+        "Export the public site to a directory of static files, with"
+        " gzipped copies and a _redirects file of legacy URLs (lines of"
+        " 'URL target 301'). Pages are written with a .html or .txt"
+        " extension, so a web server should try $uri, $uri.html, $uri.txt"
+        " and $uri/index.html in turn. Static files are not included; use"
+        " collectstatic for those. The export is incremental: each result"
+        " and statement page's ETag is recorded, and pages whose ETag has"
+        " not changed are not rendered again. The few list and index pages"
+        " are always rendered. Files whose content has not changed are not"
+        " written again."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "directory", help="The directory to export the site to",
+        )
+        parser.add_argument(
+            "--full", action="store_true",
+            help="Render and write every page, ignoring the manifest of the"
+            " previous export",
+        )
+        parser.add_argument(
+            "--no-gzip", action="store_false", dest="gzip",
+            help="Do not write gzipped copies of the files",
+        )
+
+    def handle(self, *args, **options):
+        directory = options["directory"]
+        os.makedirs(directory, exist_ok=True)
+        manifest_path = os.path.join(directory, MANIFEST)
+        manifest = {}
+        if not options["full"]:
+            try:
+                with open(manifest_path, encoding="utf-8") as manifestf:
+                    manifest = json.load(manifestf)
+            except FileNotFoundError:
+                pass
+            except ValueError as exc:
+                raise CommandError("Invalid manifest {}: {}".format(
+                    manifest_path, exc)) from exc
+        factory = RequestFactory()
+        # the list pages also show data (such as votetakers' names) that
+        # their ETags may not cover, so they are always rendered
+        lists = {reverse(name) for name in PAGES}
+        new_manifest = {}
+        written = unchanged = 0
+        for url in page_urls():
+            entry = manifest.get(url)
+            headers = {}
+            if entry and entry.get("etag") and url not in lists:
+                headers["HTTP_IF_NONE_MATCH"] = entry["etag"]
+            match = resolve(url)
+            response = match.func(
+                factory.get(url, **headers), *match.args, **match.kwargs)
+            if response.status_code == 304:
+                new_manifest[url] = entry
+                unchanged += 1
+                continue
+            if response.status_code != 200:
+                raise CommandError("{} returned status {}".format(
+                    url, response.status_code))
+            if hasattr(response, "render"):
+                response.render()
+            content = response.content
+            path = file_path(url, response["Content-Type"])
+            digest = hashlib.sha256(content).hexdigest()
+            new_manifest[url] = {
+                "path": path,
+                "digest": digest,
+                "etag": response.get("ETag"),
+            }
+            if entry and entry.get("path") == path and entry.get(
+                    "digest") == digest:
+                unchanged += 1
+                continue
+            self.write(directory, path, content, options["gzip"])
+            written += 1
+        removed = self.remove_stale(directory, manifest, new_manifest)
+        self.write(directory, REDIRECTS, "".join(
+            "{} {} 301\n".format(url, target)
+            for url, target in sorted(set(redirects()))
+        ).encode("utf-8"), False)
+        self.write(directory, MANIFEST, json.dumps(
+            new_manifest, indent=1, sort_keys=True).encode("utf-8"), False)
+        self.stdout.write(self.style.SUCCESS(
+            "Exported {} page(s): {} written, {} unchanged, {} removed".format(
+                len(new_manifest), written, unchanged, removed)))
+
+    def write(self, directory, path, content, compress):
+        """Write a file (and a gzipped copy) into the export directory."""
+        filename = os.path.join(directory, path)
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        outputs = [(filename, content)]
+        if compress:
+            outputs.append(
+                (filename + ".gz", gzip.compress(content, 9, mtime=0)))
+        for name, data in outputs:
+            with open(name + ".new", "wb") as outputf:
+                outputf.write(data)
+            os.replace(name + ".new", name)
+
+    def remove_stale(self, directory, manifest, new_manifest):
+        """
+        Delete the files of pages that were in the previous export but are
+        not in this one. Returns the number of pages removed.
+        """
+        current = {entry["path"] for entry in new_manifest.values()}
+        removed = 0
+        for url, entry in manifest.items():
+            if url in new_manifest or entry.get("path") in current:
+                continue
+            filename = os.path.join(directory, entry["path"])
+            for suffix in ("", ".gz"):
+                try:
+                    os.remove(filename + suffix)
+                except FileNotFoundError:
+                    pass
+            try:
+                os.removedirs(os.path.dirname(filename))
+            except OSError:
+                pass
+            removed += 1
+        return removed
@@ -0,0 +1,51 @@
+"""Issue ballot papers to a list of email addresses."""
+
+import sys
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from ... import mail
+from . import get_election
+
+
+class Command(BaseCommand):
+    """Issue ballot papers to a list of email addresses."""
+    help = "Issue ballot papers to a list of email addresses."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "election", help="The short name or id of the election",
+        )
+        parser.add_argument(
+            "filename",
+            help="A file containing one email address per line ('-' for"
+            " standard input)",
+        )
+        parser.add_argument(
+            "--skip-existing", action="store_true",
+            help="Do not send ballot papers to addresses that already have"
+            " a voter key",
+        )
+
+    def handle(self, *args, **options):
+        election = get_election(options["election"])
+        if "$KEY$" not in election.proposal:
+            raise CommandError(
+                "The election's proposal does not contain $KEY$")
+        if options["filename"] == "-":
+            lines = sys.stdin.read().splitlines()
+        else:
+            with open(options["filename"], encoding="utf-8") as addrfile:
+                lines = addrfile.read().splitlines()
+        addresses = [line.strip() for line in lines
+                     if line.strip() and not line.startswith("#")]
+        try:
+            created, sent, suppressed = mail.issue_ballots(
+                election, addresses, options["skip_existing"])
+        except ValidationError as exc:
+            raise CommandError("Invalid email address: {}".format(
+                "; ".join(exc.messages))) from exc
+        self.stdout.write(self.style.SUCCESS(
+            "Created {} voter(s), sent {} ballot paper(s), skipped {}"
+            " suppressed address(es)".format(created, sent, suppressed)))
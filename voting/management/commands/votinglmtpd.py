@@ -0,0 +1,72 @@
+"""Run an LMTP server to receive vote-related email."""
+
+import threading
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ... import lmtp
+
+
+class Command(BaseCommand):
+    """Run an LMTP server to receive vote-related email."""
+    help = "Run an LMTP server to receive vote-related email."
+
+    def add_arguments(self, parser):
+        group = parser.add_mutually_exclusive_group()
+        group.add_argument(
+            "--listen", default="localhost:2424", metavar="[HOST:]PORT",
+            help="The TCP address to listen on (default: %(default)s)",
+        )
+        group.add_argument(
+            "--socket", metavar="PATH",
+            help="The Unix domain socket to listen on",
+        )
+        parser.add_argument(
+            "--test", metavar="FILENAME",
+            help="Instead of running the server, start it on a temporary"
+            " port, deliver the email in FILENAME to it and print the"
+            " replies",
+        )
+        parser.add_argument(
+            "--sender", default="test@example.com",
+            help="The envelope sender for --test",
+        )
+        parser.add_argument(
+            "--rcpt", action="append",
+            help="An envelope recipient for --test (may be repeated)",
+        )
+
+    def handle(self, *args, **options):
+        if options["test"]:
+            self.test(options)
+            return
+        if options["socket"]:
+            server = lmtp.UnixLMTPServer(options["socket"])
+        else:
+            host, _, port = options["listen"].rpartition(":")
+            if not port.isdigit():
+                raise CommandError("Invalid --listen address")
+            server = lmtp.LMTPServer((host or "localhost", int(port)))
+        with server:
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+
+    def test(self, options):
+        """Deliver a message to a temporary server and print the replies."""
+        if not options["rcpt"]:
+            raise CommandError("--test requires at least one --rcpt")
+        with open(options["test"], "rb") as msgfile:
+            raw_msg = msgfile.read()
+        with lmtp.LMTPServer(("localhost", 0)) as server:
+            thread = threading.Thread(target=server.serve_forever)
+            thread.start()
+            try:
+                replies = lmtp.deliver(server.server_address, options[
+                    "sender"], options["rcpt"], raw_msg)
+            finally:
+                server.shutdown()
+                thread.join()
+        for recipient, reply in replies:
+            self.stdout.write("{}: {}".format(recipient, reply))
@@ -0,0 +1,51 @@
+"""Send the emails in the outbound mail queue."""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+
+from ...mailqueue import process_queue, queue_status
+from ...models import OutgoingEmail
+
+
+class Command(BaseCommand):
+    """Send the emails in the outbound mail queue."""
+    help = "Send the emails in the outbound mail queue."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--status", action="store_true",
+            help="Report the queue depth instead of sending",
+        )
+        parser.add_argument(
+            "--loop", type=float, metavar="SECONDS",
+            help="Keep running, checking the queue this often",
+        )
+        parser.add_argument(
+            "--limit", type=int,
+            help="Send at most this many emails per run",
+        )
+        parser.add_argument(
+            "--retry-abandoned", action="store_true",
+            help="Try again to send emails that have been abandoned",
+        )
+
+    def handle(self, *args, **options):
+        if options["status"]:
+            self.stdout.write(
+                "{} due, {} deferred, {} abandoned".format(*queue_status()))
+            return
+        if options["retry_abandoned"]:
+            OutgoingEmail.objects.filter(next_attempt=None).update(
+                next_attempt=timezone.now(), attempts=0)
+        while True:
+            sent, failed = process_queue(options["limit"])
+            if sent or failed or not options["loop"]:
+                self.stdout.write("Sent {} email(s), {} failed".format(
+                    sent, failed))
+            if not options["loop"]:
+                return
+            close_old_connections()
+            time.sleep(options["loop"])
@@ -0,0 +1,102 @@
+"""Benchmark fetching news articles from a simulated news server."""
+
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from ...newsserver import NewsServer
+from ... import nntp
+
+
+def synthetic_articles(rng, count, size):
+    """Yield (msgid, article bytes) for synthetic articles of about size."""
+    words = ("ballot", "election", "result", "votetaker", "proposal",
+             "group", "newsgroup", "valid", "votes", "abstain", "yes", "no")
+    for n in range(count):
+        msgid = "<bench{}@example.invalid>".format(n)
+        body = []
+        length = 0
+        while length < size:
+            line = " ".join(rng.choices(words, k=10))
+            body.append(line)
+            length += len(line) + 1
+        yield msgid, "\n".join([
+            "From: votetaker@example.invalid",
+            "Newsgroups: uk.net.news.announce",
+            "Subject: RESULT: benchmark election {}".format(n),
+            "Message-ID: " + msgid,
+            "",
+        ] + body + [""]).encode("ascii")
+
+
+class Command(BaseCommand):
+    """Benchmark fetching news articles from a simulated news server."""
+    help = (
+        "Benchmark fetching news articles from a simulated news server, at"
+        " each combination of the given round trip times, numbers of"
+        " connections and pipeline depths, and report articles per second."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--articles", type=int, default=200,
+            help="The number of articles to fetch (default: %(default)s)",
+        )
+        parser.add_argument(
+            "--size", type=int, default=4000,
+            help="The approximate size of each article in bytes"
+            " (default: %(default)s)",
+        )
+        parser.add_argument(
+            "--missing", type=float, default=0.1,
+            help="The fraction of requested articles that the server does"
+            " not have (default: %(default)s)",
+        )
+        parser.add_argument(
+            "--latency", type=float, nargs="+", default=[0, 10, 50],
+            help="The simulated round trip times in milliseconds",
+        )
+        parser.add_argument(
+            "--connections", type=int, nargs="+", default=[1, 4],
+            help="The numbers of concurrent connections to use",
+        )
+        parser.add_argument(
+            "--depth", type=int, nargs="+", default=[1, nntp.PIPELINE_DEPTH],
+            help="The pipeline depths to use",
+        )
+        parser.add_argument(
+            "--seed", type=int, default=0,
+            help="The seed for the random number generator",
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        articles = list(synthetic_articles(
+            rng, options["articles"], options["size"]))
+        msgids = [msgid for msgid, _ in articles]
+        msgids.extend("<missing{}@example.invalid>".format(n) for n in range(
+            int(len(msgids) * options["missing"])))
+        rng.shuffle(msgids)
+        self.stdout.write("{:>8} {:>11} {:>5} {:>8} {:>8} {:>10}".format(
+            "latency", "connections", "depth", "fetched", "time",
+            "articles/s"))
+        for latency in options["latency"]:
+            with NewsServer(articles, latency=latency / 1000) as server:
+                for connections in options["connections"]:
+                    for depth in options["depth"]:
+                        self.benchmark(
+                            server, msgids, latency, connections, depth)
+
+    def benchmark(self, server, msgids, latency, connections, depth):
+        """Fetch the articles once and write a line of results."""
+        start = time.perf_counter()
+        fetched = sum(
+            1 for _, _, lines in nntp.fetch_articles(
+                msgids, connections, server.url(), depth)
+            if lines is not None)
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            "{:>6.0f}ms {:>11} {:>5} {:>8} {:>7.3f}s {:>10.1f}".format(
+                latency, connections, depth, fetched, elapsed,
+                len(msgids) / elapsed))
@@ -0,0 +1,17 @@
+"""Render the stored pages for all results and statements."""
+
+from django.core.management.base import BaseCommand
+
+from ...pages import render_all
+
+
+class Command(BaseCommand):
+    """Render the stored pages for all results and statements."""
+    help = (
+        "Render the stored pages for all results and statements. Run this"
+        " after changing the result or statement templates."
+    )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS(
+            "Rendered {} page(s)".format(render_all())))
@@ -0,0 +1,56 @@
+"""Check or rebuild the running vote tallies."""
+
+from django.core.management.base import BaseCommand
+
+from ...models import Election, Tally
+from . import get_election
+
+
+class Command(BaseCommand):
+    """Check or rebuild the running vote tallies."""
+    help = "Check the running vote tallies against the votes, or rebuild them."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "election", nargs="*",
+            help="The short names or ids of the elections (default: all"
+            " elections that are accepting or counting votes)",
+        )
+        parser.add_argument(
+            "--rebuild", action="store_true",
+            help="Rebuild the tallies from the votes if they do not match",
+        )
+
+    def handle(self, *args, **options):
+        if options["election"]:
+            elections = [get_election(key) for key in options["election"]]
+        else:
+            elections = Election.objects.filter(
+                status__in=(Election.ACTIVE, Election.COUNT))
+        mismatched = 0
+        for election in elections:
+            provisional = {
+                choice.id: votes
+                for totals in election.choice_totals(provisional=True)
+                for choice, votes in totals.totals
+            }
+            wrong = [
+                (choice, provisional.get(choice.id), votes)
+                for totals in election.choice_totals()
+                for choice, votes in totals.totals
+                if provisional.get(choice.id) != votes
+            ]
+            for choice, tally, votes in wrong:
+                self.stdout.write(self.style.NOTICE(
+                    "{}: {}: {}: tally {} but {} votes".format(
+                        election.shortname or election.id,
+                        choice.question, choice, tally, votes)))
+            if wrong:
+                mismatched += 1
+                if options["rebuild"]:
+                    Tally.rebuild(election)
+        self.stdout.write(self.style.SUCCESS(
+            "{} election(s) checked, {} with mismatched tallies{}".format(
+                len(elections), mismatched,
+                " (rebuilt)" if mismatched and options["rebuild"] else "")
+        ))
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 17:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voting', '0003_alter_election_secondary_alter_election_votetaker'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='seats',
+            field=models.PositiveSmallIntegerField(default=1, help_text='The number of choices to be elected (STV only).'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-18 17:25
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voting', '0004_question_seats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tally',
+            fields=[
+                ('choice', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to='voting.choice')),
+                ('votes', models.IntegerField(default=0)),
+            ],
+        ),
+    ]
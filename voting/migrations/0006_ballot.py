@@ -0,0 +1,26 @@
+# Generated by Django 4.2.30 on 2026-10-18 17:26
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voting', '0005_tally'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Ballot',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ranking', models.BinaryField(help_text="The voter's choice ids, in order of preference, packed as little-endian 32-bit integers.")),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='voting.question')),
+                ('voter', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='voting.voter')),
+            ],
+            options={
+                'unique_together': {('question', 'voter')},
+            },
+        ),
+    ]
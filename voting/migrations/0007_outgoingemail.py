@@ -0,0 +1,30 @@
+# Generated by Django 4.2.30 on 2026-10-18 17:31
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voting', '0006_ballot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutgoingEmail',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_email', models.CharField(max_length=254)),
+                ('recipients', models.TextField(help_text='The envelope recipients, one per line.')),
+                ('message', models.BinaryField()),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('next_attempt', models.DateTimeField(db_index=True, default=django.utils.timezone.now, help_text='When to next try sending the email, or empty if sending has been abandoned.', null=True)),
+                ('last_error', models.TextField(blank=True)),
+            ],
+            options={
+                'ordering': ('next_attempt', 'id'),
+            },
+        ),
+    ]
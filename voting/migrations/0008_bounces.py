@@ -0,0 +1,32 @@
+# Generated by Django 4.2.30 on 2026-10-18 17:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voting', '0007_outgoingemail'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Suppression',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('email', models.EmailField(help_text='The suppressed address, in lower case.', max_length=254, unique=True)),
+                ('creation_date', models.DateTimeField(auto_now_add=True)),
+                ('reason', models.TextField(blank=True, help_text='Why the address was suppressed, e.g. the bounce status.')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='voter',
+            name='bounce_count',
+            field=models.PositiveSmallIntegerField(default=0, help_text='The number of times a ballot paper sent to this voter has bounced.'),
+        ),
+        migrations.AddField(
+            model_name='voter',
+            name='last_bounce',
+            field=models.DateTimeField(blank=True, help_text='The date/time a ballot paper sent to this voter last bounced.', null=True),
+        ),
+    ]
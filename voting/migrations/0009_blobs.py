@@ -0,0 +1,100 @@
+# Generated by Django 4.2.30 on 2026-10-18 17:34
+
+import hashlib
+import zlib
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+FIELDS = (
+    ('Email', 'email', 'email_blob'),
+    ('Voter', 'email_headers', 'email_headers_blob'),
+    ('VoterIPAddress', 'headers', 'headers_blob'),
+)
+
+
+def move_to_blobs(apps, schema_editor):
+    Blob = apps.get_model('voting', 'Blob')
+    for model_name, text_field, blob_field in FIELDS:
+        model = apps.get_model('voting', model_name)
+        for obj in model.objects.only('id', text_field).iterator():
+            encoded = getattr(obj, text_field).encode('utf-8', 'surrogatepass')
+            digest = hashlib.sha256(encoded).hexdigest()
+            Blob.objects.get_or_create(digest=digest, defaults={
+                'data': zlib.compress(encoded, 9),
+                'size': len(encoded),
+            })
+            model.objects.filter(id=obj.id).update(**{blob_field: digest})
+
+
+def move_from_blobs(apps, schema_editor):
+    Blob = apps.get_model('voting', 'Blob')
+    for model_name, text_field, blob_field in FIELDS:
+        model = apps.get_model('voting', model_name)
+        for obj in model.objects.exclude(**{blob_field: None}).iterator():
+            blob = Blob.objects.get(digest=getattr(obj, blob_field + '_id'))
+            text = zlib.decompress(bytes(blob.data)).decode(
+                'utf-8', 'surrogatepass')
+            model.objects.filter(id=obj.id).update(**{text_field: text})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voting', '0008_bounces'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Blob',
+            fields=[
+                ('digest', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('data', models.BinaryField()),
+                ('size', models.PositiveIntegerField(help_text='The uncompressed size of the content in bytes.')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='email',
+            name='email_blob',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='voting.blob'),
+        ),
+        migrations.AddField(
+            model_name='voter',
+            name='email_headers_blob',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='voting.blob'),
+        ),
+        migrations.AddField(
+            model_name='voteripaddress',
+            name='headers_blob',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='voting.blob'),
+        ),
+        migrations.RunPython(move_to_blobs, move_from_blobs),
+        migrations.AlterField(
+            model_name='email',
+            name='email',
+            field=models.TextField(default=''),
+        ),
+        migrations.AlterField(
+            model_name='voter',
+            name='email_headers',
+            field=models.TextField(default='', help_text='The headers of the first email received requesting a ballot key.'),
+        ),
+        migrations.AlterField(
+            model_name='voteripaddress',
+            name='headers',
+            field=models.TextField(default='', verbose_name='HTTP headers'),
+        ),
+        migrations.RemoveField(
+            model_name='email',
+            name='email',
+        ),
+        migrations.RemoveField(
+            model_name='voter',
+            name='email_headers',
+        ),
+        migrations.RemoveField(
+            model_name='voteripaddress',
+            name='headers',
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.30 on 2026-10-18 17:36
+
+from django.db import migrations, models
+import voting.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voting', '0009_blobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArticleFetch',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('msgid', voting.models.MessageIDField(max_length=250, unique=True, verbose_name='Message-ID')),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('last_attempt', models.DateTimeField()),
+                ('next_attempt', models.DateTimeField(db_index=True)),
+                ('response', models.CharField(blank=True, help_text="The news server's response to the last attempt.", max_length=250)),
+            ],
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.30 on 2026-10-18 17:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voting', '0010_articlefetch'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NewsGroup',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=250, unique=True)),
+                ('high_water', models.PositiveIntegerField(default=0, help_text='The highest article number scanned so far.')),
+                ('last_scan', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.30 on 2026-10-18 17:43
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voting', '0011_newsgroup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RenderedPage',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('html', models.TextField()),
+                ('rendered', models.DateTimeField(auto_now=True)),
+                ('election', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='rendered_page', to='voting.election')),
+                ('statement', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='rendered_page', to='voting.statement')),
+            ],
+        ),
+    ]
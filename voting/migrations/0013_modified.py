@@ -0,0 +1,50 @@
+# Generated by Django 4.2.30 on 2026-10-18 17:45
+
+from django.db import migrations, models
+import hashlib
+
+
+def _digest(text):
+    return hashlib.sha256(text.encode("utf-8", "surrogatepass")).hexdigest()
+
+
+def add_digests(apps, schema_editor):
+    RenderedPage = apps.get_model("voting", "RenderedPage")
+    for page in RenderedPage.objects.select_related("election", "statement"):
+        page.html_digest = _digest(page.html)
+        page.article_digest = _digest(
+            page.election.result if page.election else page.statement.statement)
+        page.save(update_fields=("html_digest", "article_digest"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voting', '0012_renderedpage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='election',
+            name='modified',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='renderedpage',
+            name='article_digest',
+            field=models.CharField(default='', help_text='The SHA-256 digest of the raw article.', max_length=64),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='renderedpage',
+            name='html_digest',
+            field=models.CharField(default='', help_text='The SHA-256 digest of the HTML.', max_length=64),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='statement',
+            name='modified',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(add_digests, migrations.RunPython.noop),
+    ]
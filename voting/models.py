@@ -1,15 +1,24 @@
 """voting models."""
 
+from collections import Counter
+import datetime
+import hashlib
 import re
 import uuid
+import zlib
 
+from django.apps import apps
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.urls import reverse
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, Exists, F, OuterRef, Q
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 
+from .ballots import pack_ranking, unpack_ranking
 from .fields import EmailListField
+from .settings import NEWS_MAX_RETRY_DELAY, NEWS_RETRY_DELAY
 
 
 def _validate_messageid(value):
@@ -30,6 +39,92 @@ def _validate_messageid(value):
         raise ValidationError("Enter a valid Message-ID.", code="invalid")
 
 
+class Blob(models.Model):
+    """
+    Blob model - compressed text, stored once per distinct content and
+    addressed by its SHA-256 digest. Large raw email payloads are kept here
+    rather than in the main tables, and are only loaded when accessed.
+    """
+    digest = models.CharField(max_length=64, primary_key=True)
+    data = models.BinaryField()
+    size = models.PositiveIntegerField(
+        help_text="The uncompressed size of the content in bytes.")
+
+    def __str__(self):
+        return self.digest
+
+    @staticmethod
+    def _encode(text):
+        """Return (digest, encoded bytes) for the given text."""
+        encoded = text.encode("utf-8", "surrogatepass")
+        return hashlib.sha256(encoded).hexdigest(), encoded
+
+    @classmethod
+    def store(cls, text):
+        """Return the Blob for the given text, creating it if necessary."""
+        return cls.store_many((text,))[text]
+
+    @classmethod
+    def store_many(cls, texts):
+        """
+        Return a dictionary mapping each of the given texts to its Blob,
+        creating any that do not exist yet with a single bulk insert.
+        """
+        encoded = {text: cls._encode(text) for text in texts}
+        blobs = cls.objects.in_bulk(
+            {digest for digest, _ in encoded.values()})
+        missing = {digest: data for digest, data in encoded.values()
+                   if digest not in blobs}
+        if missing:
+            cls.objects.bulk_create(
+                (cls(digest=digest, data=zlib.compress(data, 9),
+                     size=len(data))
+                 for digest, data in missing.items()),
+                ignore_conflicts=True)
+            blobs.update(cls.objects.in_bulk(missing))
+        return {text: blobs[digest] for text, (digest, _) in encoded.items()}
+
+    def text(self):
+        """Return the decompressed text."""
+        return zlib.decompress(bytes(self.data)).decode(
+            "utf-8", "surrogatepass")
+
+    @classmethod
+    def references(cls):
+        """Return the foreign key fields, on any model, that refer to Blobs."""
+        return [field for model in apps.get_models()
+                for field in model._meta.get_fields()
+                if field.many_to_one and field.related_model is cls]
+
+    @classmethod
+    def delete_unreferenced(cls, digests=None):
+        """
+        Delete the Blobs (optionally only those with the given digests) that
+        nothing refers to any more, and return the number deleted.
+        """
+        blobs = cls.objects.only("digest")
+        if digests is not None:
+            blobs = blobs.filter(digest__in=[
+                digest for digest in digests if digest])
+        for field in cls.references():
+            blobs = blobs.exclude(Exists(field.model.objects.filter(
+                **{field.name: OuterRef("pk")})))
+        return blobs.delete()[0]
+
+
+def _blob_text(field_name, doc):
+    """Return a property exposing the Blob foreign key field_name as text."""
+
+    def getter(self):
+        blob = getattr(self, field_name)
+        return blob.text() if blob else ""
+
+    def setter(self, value):
+        setattr(self, field_name, Blob.store(value or ""))
+
+    return property(getter, setter, doc=doc)
+
+
 class MessageIDField(models.CharField):
     """Field type to accept and validate Usenet Message-IDs."""
     default_validators = [_validate_messageid]
@@ -75,6 +170,7 @@ class Statement(models.Model):
         "Message-ID",
         help_text="The Message-ID of the published statement.")
     statement = models.TextField(editable=False)
+    modified = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.title
@@ -187,6 +283,7 @@ class Election(models.Model):
         " are automatically createed from the 'Proposal' field (which must"
         " contain the string $KEY$ for the voter's secret key). Completed"
         " votes are forwarded to all addresses in this comma-separated list.")
+    modified = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ("-cfv_date",)
@@ -219,6 +316,18 @@ class Election(models.Model):
         """Returns the latest date associated with this election, or None."""
         return self.result_date or self.cfv_end_date or self.cfv_date
 
+    def choice_totals(self, method=None, provisional=False):
+        """
+        Return a list of QuestionTotals for the questions in this election
+        (optionally only those using the given method), counting the votes
+        of accepted voters with a single aggregate query. If provisional is
+        True then the running Tally is read instead of the Vote rows.
+        """
+        choices = Choice.objects.filter(question__election=self)
+        if method:
+            choices = choices.filter(question__method=method)
+        return QuestionTotals.from_choices(choices, provisional)
+
 
 class Question(models.Model):
     """Question model."""
@@ -240,6 +349,9 @@ class Question(models.Model):
     details = models.TextField(
         blank=True,
         help_text="This text, if any, is displayed next to the question.")
+    seats = models.PositiveSmallIntegerField(
+        default=1,
+        help_text="The number of choices to be elected (STV only).")
 
     class Meta:
         order_with_respect_to = "election"
@@ -247,6 +359,12 @@ class Question(models.Model):
     def __str__(self):
         return self.question
 
+    def choice_totals(self, provisional=False):
+        """Return the QuestionTotals for this question."""
+        totals = QuestionTotals.from_choices(
+            self.choice_set.all(), provisional)
+        return totals[0] if totals else QuestionTotals(self, [])
+
 
 class Choice(models.Model):
     """Choice model."""
@@ -257,6 +375,99 @@ class Choice(models.Model):
         return self.choice
 
 
+class Tally(models.Model):
+    """
+    The running count of accepted votes for a choice. It is updated by
+    Voter.save and Voter.set_votes, and when a Vote is created or deleted
+    individually or by cascade (see signals.py). Bulk changes that send no
+    signals, such as QuerySet.update(accepted=...) on Voters or
+    bulk_create of Votes, bypass it: run 'votingtally --rebuild' after them.
+    """
+    choice = models.OneToOneField(
+        Choice, primary_key=True, on_delete=models.CASCADE)
+    votes = models.IntegerField(default=0)
+
+    def __str__(self):
+        return "{}: {}".format(self.choice, self.votes)
+
+    @classmethod
+    def adjust(cls, choice_ids, delta):
+        """
+        Add delta to the tallies for each of the given choice ids. Missing
+        tallies are created only when delta is positive, as votes are also
+        removed while their choices are being deleted.
+        """
+        counts = Counter(choice_ids)
+        if not counts:
+            return
+        if delta > 0:
+            cls.objects.bulk_create(
+                (cls(choice_id=choice_id) for choice_id in counts),
+                ignore_conflicts=True)
+        multiples = {}
+        for choice_id, count in counts.items():
+            multiples.setdefault(count, []).append(choice_id)
+        for count, ids in multiples.items():
+            cls.objects.filter(choice_id__in=ids).update(
+                votes=F("votes") + delta * count)
+
+    @classmethod
+    def rebuild(cls, election):
+        """Recalculate the tallies for an election from the Vote rows."""
+        with transaction.atomic():
+            cls.objects.filter(choice__question__election=election).delete()
+            cls.objects.bulk_create(
+                cls(choice=choice, votes=votes)
+                for totals in election.choice_totals()
+                for choice, votes in totals.totals
+            )
+
+
+class QuestionTotals:
+    """The number of votes cast for each choice of a question."""
+
+    def __init__(self, question, totals):
+        self.question = question
+        self.totals = totals
+
+    @classmethod
+    def from_choices(cls, choices, provisional=False):
+        """
+        Return a list of QuestionTotals, in question order, for the given
+        Choice queryset. If provisional is True then the votes are read from
+        the running Tally rather than counted from the Vote rows.
+        """
+        if provisional:
+            votes = Coalesce("tally__votes", 0)
+        else:
+            votes = Count("vote", filter=Q(vote__voter__accepted=True))
+        choices = choices.annotate(votes=votes).select_related(
+            "question").order_by(
+            "question__election_id", "question___order", "id")
+        results = []
+        for choice in choices:
+            if not results or results[-1].question.id != choice.question_id:
+                results.append(cls(choice.question, []))
+            results[-1].totals.append((choice, choice.votes))
+        return results
+
+    def total(self):
+        """Return the total number of votes for all choices."""
+        return sum(votes for _, votes in self.totals)
+
+    def winners(self):
+        """Return the list of choices with the most votes."""
+        most = max((votes for _, votes in self.totals), default=0)
+        return [choice for choice, votes in self.totals
+                if votes == most and most]
+
+    def __str__(self):
+        return "\n".join(
+            "{:>7}  {}".format(votes, choice)
+            for choice, votes in self.totals
+        )
+
+
 class Voter(models.Model):
     """Voter model."""
     key = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
@@ -287,9 +498,20 @@ class Voter(models.Model):
     notes = models.TextField(
         blank=True,
         help_text="Private notes by the votetaker.")
-    email_headers = models.TextField(
-        help_text="The headers of the first email received requesting"
-        " a ballot key.")
+    email_headers_blob = models.ForeignKey(
+        Blob, null=True, editable=False, related_name="+",
+        on_delete=models.PROTECT)
+    email_headers = _blob_text(
+        "email_headers_blob",
+        "The headers of the first email received requesting a ballot key.")
+    bounce_count = models.PositiveSmallIntegerField(
+        default=0,
+        help_text="The number of times a ballot paper sent to this voter"
+        " has bounced.")
+    last_bounce = models.DateTimeField(
+        blank=True, null=True,
+        help_text="The date/time a ballot paper sent to this voter last"
+        " bounced.")
 
     class Meta:
         unique_together = ("election", "email")
@@ -297,6 +519,78 @@ class Voter(models.Model):
     def __str__(self):
         return self.email
 
+    def _lock_accepted(self):
+        """Lock this voter's row and return its stored accepted status."""
+        if self.pk is None:
+            return False
+        return bool(Voter.objects.select_for_update().filter(
+            pk=self.pk).values_list("accepted", flat=True).first())
+
+    def save(self, *args, **kwargs):
+        """Save the voter, updating the Tally if 'accepted' has changed."""
+        with transaction.atomic():
+            previous = self._lock_accepted()
+            super().save(*args, **kwargs)
+            if self.accepted != previous:
+                Tally.adjust(
+                    self.vote_set.values_list("choice_id", flat=True),
+                    1 if self.accepted else -1)
+
+    def set_votes(self, choices, question=None):
+        """
+        Replace this voter's votes with the given choices, in order of
+        preference. If a question is given then only the votes for that
+        question are replaced. The Tally is updated in the same transaction
+        (for the deleted votes, by the post_delete signal handler), as are
+        this voter's Ballots for any of the questions that have Ballots.
+        """
+        with transaction.atomic():
+            accepted = self._lock_accepted()
+            old = self.vote_set.all()
+            if question is not None:
+                old = old.filter(choice__question=question)
+            old.delete()
+            new = Vote.objects.bulk_create(
+                Vote(voter=self, choice=choice) for choice in choices)
+            if accepted:
+                Tally.adjust((vote.choice_id for vote in new), 1)
+            packed = Question.objects.filter(
+                Exists(Ballot.objects.filter(question=OuterRef("pk"))),
+                election_id=self.election_id)
+            if question is not None:
+                packed = packed.filter(pk=question.pk)
+            packed = list(packed.values_list("id", flat=True))
+            if packed:
+                Ballot.pack(self.election, voters=(self.pk,),
+                            questions=packed)
+
+
+class Suppression(models.Model):
+    """An email address that ballot papers must not be sent to."""
+    email = models.EmailField(
+        unique=True,
+        help_text="The suppressed address, in lower case.")
+    creation_date = models.DateTimeField(auto_now_add=True)
+    reason = models.TextField(
+        blank=True,
+        help_text="Why the address was suppressed, e.g. the bounce status.")
+
+    def __str__(self):
+        return self.email
+
+    @classmethod
+    def suppress(cls, email, reason=""):
+        """Add an email address to the suppression list."""
+        return cls.objects.get_or_create(
+            email=email.lower(), defaults={"reason": reason})[0]
+
+    @classmethod
+    def suppressed(cls, emails):
+        """Return the set of the given email addresses that are suppressed."""
+        emails = {email.lower(): email for email in emails}
+        return {emails[email] for email in cls.objects.filter(
+            email__in=emails).values_list("email", flat=True)}
+
 
 class VoterIPAddress(models.Model):
     """Model for the IP addresses seen in use by a voter."""
@@ -305,7 +599,10 @@ class VoterIPAddress(models.Model):
     ip_address = models.GenericIPAddressField(
         "IP address", unpack_ipv4=True, db_index=True)
     fingerprint = models.CharField(max_length=128, db_index=True)
-    headers = models.TextField("HTTP headers")
+    headers_blob = models.ForeignKey(
+        Blob, null=True, editable=False, related_name="+",
+        on_delete=models.PROTECT)
+    headers = _blob_text("headers_blob", "HTTP headers")
     asn_info = models.CharField("AS info", max_length=250, db_index=True)
     browser_info = models.TextField()
 
@@ -322,9 +619,197 @@ class Vote(models.Model):
         return str(self.choice)
 
 
+class Ballot(models.Model):
+    """
+    Ballot model - a voter's complete ranking for a question, stored as a
+    single packed column alongside the equivalent Vote rows.
+    """
+    voter = models.ForeignKey(Voter, on_delete=models.CASCADE)
+    question = models.ForeignKey(Question, on_delete=models.CASCADE)
+    ranking = models.BinaryField(
+        help_text="The voter's choice ids, in order of preference, packed"
+        " as little-endian 32-bit integers.")
+
+    class Meta:
+        unique_together = ("question", "voter")
+
+    def __str__(self):
+        return "{}: {}".format(self.voter, self.question)
+
+    def choice_ids(self):
+        """Return the list of ranked choice ids."""
+        return unpack_ranking(bytes(self.ranking))
+
+    def to_votes(self):
+        """Return a list of the equivalent (unsaved) Vote objects."""
+        return [Vote(voter_id=self.voter_id, choice_id=choice_id)
+                for choice_id in self.choice_ids()]
+
+    @classmethod
+    def pack(cls, election, voters=None, questions=None):
+        """
+        Replace the Ballots for the questions in an election (optionally
+        only those of the given voter and question ids) with ones built
+        from the Vote rows. Returns the number of Ballots created.
+        """
+        ballots = cls.objects.filter(question__election=election)
+        votes = Vote.objects.filter(choice__question__election=election)
+        if voters is not None:
+            ballots = ballots.filter(voter__in=voters)
+            votes = votes.filter(voter__in=voters)
+        if questions is not None:
+            ballots = ballots.filter(question__in=questions)
+            votes = votes.filter(choice__question__in=questions)
+        rankings = {}
+        for question_id, voter_id, choice_id in votes.order_by(
+                "id").values_list(
+                    "choice__question_id", "voter_id", "choice_id").iterator():
+            ranking = rankings.setdefault((question_id, voter_id), [])
+            if choice_id not in ranking:
+                ranking.append(choice_id)
+        with transaction.atomic():
+            ballots.delete()
+            cls.objects.bulk_create(
+                (cls(question_id=question_id, voter_id=voter_id,
+                     ranking=pack_ranking(ranking))
+                 for (question_id, voter_id), ranking in rankings.items()),
+                batch_size=1000)
+        return len(rankings)
+
+    @classmethod
+    def unpack(cls, election):
+        """
+        Replace the Vote rows for the questions in an election that have
+        Ballots with ones built from the Ballots, and rebuild the Tally.
+        Returns the number of Votes created.
+        """
+        with transaction.atomic():
+            ballots = list(cls.objects.filter(question__election=election))
+            Vote.objects.filter(choice__question__in={
+                ballot.question_id for ballot in ballots}).delete()
+            votes = Vote.objects.bulk_create(
+                (vote for ballot in ballots for vote in ballot.to_votes()),
+                batch_size=1000)
+            # deleting the Votes also deleted their Ballots (see signals.py)
+            cls.objects.filter(question__election=election).delete()
+            cls.objects.bulk_create(ballots, batch_size=1000)
+            Tally.rebuild(election)
+        return len(votes)
+
+
 class Email(models.Model):
     """Email model to record votes received by email."""
     voter = models.ForeignKey(
         Voter, related_name="vote_emails", on_delete=models.CASCADE)
     received_date = models.DateTimeField(auto_now_add=True)
-    email = models.TextField()
+    email_blob = models.ForeignKey(
+        Blob, null=True, editable=False, related_name="+",
+        on_delete=models.PROTECT)
+    email = _blob_text("email_blob", "The raw email.")
+
+
+class OutgoingEmail(models.Model):
+    """An email waiting in the outbound mail queue."""
+    from_email = models.CharField(max_length=254)
+    recipients = models.TextField(
+        help_text="The envelope recipients, one per line.")
+    message = models.BinaryField()
+    created = models.DateTimeField(auto_now_add=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt = models.DateTimeField(
+        null=True, default=timezone.now, db_index=True,
+        help_text="When to next try sending the email, or empty if sending"
+        " has been abandoned.")
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ("next_attempt", "id")
+
+    def __str__(self):
+        return "{} -> {}".format(self.from_email, self.recipients)
+
+
+class ArticleFetch(models.Model):
+    """
+    A failed attempt to fetch a news article, so that articles the news
+    server does not have are retried with exponential backoff rather than
+    re-requested on every run.
+    """
+    msgid = MessageIDField("Message-ID", unique=True)
+    attempts = models.PositiveIntegerField(default=0)
+    last_attempt = models.DateTimeField()
+    next_attempt = models.DateTimeField(db_index=True)
+    response = models.CharField(
+        max_length=250, blank=True,
+        help_text="The news server's response to the last attempt.")
+
+    def __str__(self):
+        return self.msgid
+
+    @classmethod
+    def deferred(cls, msgids):
+        """Return the set of the given Message-IDs not yet due a retry."""
+        return set(cls.objects.filter(
+            msgid__in=msgids, next_attempt__gt=timezone.now()
+        ).values_list("msgid", flat=True))
+
+    @classmethod
+    def failed(cls, msgid, response):
+        """
+        Record a failed attempt to fetch an article, because the news server
+        does not have it (not because of a connection or server error).
+        """
+        now = timezone.now()
+        fetch = cls.objects.get_or_create(
+            msgid=msgid, defaults={"last_attempt": now, "next_attempt": now}
+        )[0]
+        fetch.attempts += 1
+        fetch.last_attempt = now
+        fetch.next_attempt = now + datetime.timedelta(seconds=min(
+            NEWS_RETRY_DELAY * 2 ** (fetch.attempts - 1),
+            NEWS_MAX_RETRY_DELAY))
+        fetch.response = response[:250]
+        fetch.save()
+        return fetch
+
+    @classmethod
+    def fetched(cls, msgids):
+        """Forget the failed attempts for articles that have been fetched."""
+        cls.objects.filter(msgid__in=msgids).delete()
+
+
+class NewsGroup(models.Model):
+    """
+    A newsgroup scanned for CFV and result postings, recording the highest
+    article number scanned so far.
+    """
+    name = models.CharField(max_length=250, unique=True)
+    high_water = models.PositiveIntegerField(
+        default=0, help_text="The highest article number scanned so far.")
+    last_scan = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return self.name
+
+
+class RenderedPage(models.Model):
+    """
+    The pre-rendered HTML of the public page for an election result or a
+    statement, so that it can be served without parsing the article or
+    running the template.
+    """
+    election = models.OneToOneField(
+        Election, null=True, blank=True, on_delete=models.CASCADE,
+        related_name="rendered_page")
+    statement = models.OneToOneField(
+        Statement, null=True, blank=True, on_delete=models.CASCADE,
+        related_name="rendered_page")
+    html = models.TextField()
+    html_digest = models.CharField(
+        max_length=64, help_text="The SHA-256 digest of the HTML.")
+    article_digest = models.CharField(
+        max_length=64, help_text="The SHA-256 digest of the raw article.")
+    rendered = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return str(self.election or self.statement)
@@ -0,0 +1,256 @@
+"""
+A small in-process NNTP server, standing in for the real news server when
+testing or benchmarking the news fetching code. It serves a fixed set of
+articles from a single group, and supports ARTICLE, OVER/XOVER, GROUP,
+AUTHINFO USER/PASS and enough else for nntplib to talk to it. STARTTLS is
+always refused. Each reply can be delayed to simulate a network round trip.
+"""
+
+from email.parser import BytesHeaderParser
+import queue
+import socket
+import socketserver
+import threading
+import time
+
+
+MAX_LINE_LENGTH = 512
+
+OVERVIEW_FORMAT = (
+    "Subject:", "From:", "Date:", "Message-ID:", "References:", ":bytes",
+    ":lines",
+)
+
+
+def overview(number, article):
+    """Return the overview line for an article."""
+    headers = BytesHeaderParser().parsebytes(article)
+    fields = [str(number)]
+    fields.extend(
+        " ".join(str(headers[name[:-1]] or "").split())
+        for name in OVERVIEW_FORMAT[:5])
+    body = article.partition(b"\n\n")[2]
+    fields.extend((str(len(article)), str(body.count(b"\n"))))
+    return "\t".join(fields)
+
+
+class NewsHandler(socketserver.StreamRequestHandler):
+    """Handle one NNTP session."""
+
+    def setup(self):
+        super().setup()
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.received = time.monotonic()
+        self.user = None
+        self.authenticated = not self.server.username
+        self.group = False
+        self.lines = queue.Queue()
+        threading.Thread(target=self.read_lines, daemon=True).start()
+
+    def read_lines(self):
+        """
+        Read command lines as they arrive, noting the time each was
+        received, so that pipelined commands are replied to one round trip
+        after they were sent rather than one after another.
+        """
+        try:
+            while True:
+                line = self.rfile.readline(MAX_LINE_LENGTH)
+                self.lines.put((time.monotonic(), line))
+                if not line:
+                    return
+        except (OSError, ValueError):
+            self.lines.put((time.monotonic(), b""))
+
+    def reply(self, line, body=None):
+        """
+        Send a reply line and an optional multi-line body (a list of byte
+        strings), once the simulated round trip time has passed.
+        """
+        delay = self.received + self.server.latency - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        data = [line.encode("utf-8", "replace") + b"\r\n"]
+        if body is not None:
+            data.extend(
+                (b"." + text if text.startswith(b".") else text) + b"\r\n"
+                for text in body)
+            data.append(b".\r\n")
+        self.wfile.write(b"".join(data))
+        self.wfile.flush()
+
+    def handle(self):
+        self.reply("200 voting news server ready (posting prohibited)")
+        while True:
+            self.received, line = self.lines.get()
+            if not line:
+                return
+            command, _, arg = line.decode(
+                "utf-8", "replace").rstrip("\r\n").partition(" ")
+            command = command.upper()
+            method = getattr(self, "nntp_" + command, None)
+            if method is None:
+                self.reply("500 Unknown command")
+            elif not (self.authenticated or command in (
+                    "AUTHINFO", "CAPABILITIES", "MODE", "QUIT", "STARTTLS")):
+                self.reply("480 Authentication required")
+            elif method(arg.strip()) is False:
+                return
+
+    def nntp_CAPABILITIES(self, arg):
+        """Handle the CAPABILITIES command."""
+        # pylint: disable=invalid-name,unused-argument
+        capabilities = [b"VERSION 2", b"READER", b"OVER"]
+        if not self.authenticated:
+            capabilities.append(b"AUTHINFO USER")
+        self.reply("101 Capability list follows", capabilities)
+
+    def nntp_MODE(self, arg):
+        """Handle the MODE READER command."""
+        # pylint: disable=invalid-name
+        if arg.upper() != "READER":
+            self.reply("501 Unknown MODE variant")
+        else:
+            self.reply("200 Posting prohibited")
+
+    def nntp_STARTTLS(self, arg):
+        """Refuse the STARTTLS command."""
+        # pylint: disable=invalid-name,unused-argument
+        self.reply("580 Can not initiate TLS negotiation")
+
+    def nntp_AUTHINFO(self, arg):
+        """Handle the AUTHINFO USER and AUTHINFO PASS commands."""
+        # pylint: disable=invalid-name
+        kind, _, value = arg.partition(" ")
+        if self.authenticated:
+            self.reply("502 Already authenticated")
+        elif kind.upper() == "USER":
+            self.user = value
+            self.reply("381 Password required")
+        elif kind.upper() != "PASS":
+            self.reply("501 Unknown AUTHINFO variant")
+        elif self.user is None:
+            self.reply("482 Authentication commands issued out of sequence")
+        elif (self.user, value) == (self.server.username,
+                                    self.server.password):
+            self.authenticated = True
+            self.reply("281 Authentication accepted")
+        else:
+            self.user = None
+            self.reply("481 Authentication failed")
+
+    def nntp_LIST(self, arg):
+        """Handle the LIST OVERVIEW.FMT command."""
+        # pylint: disable=invalid-name
+        if arg.upper() != "OVERVIEW.FMT":
+            self.reply("501 Unsupported LIST variant")
+        else:
+            self.reply("215 Order of fields in overview database.", [
+                name.encode("ascii") for name in OVERVIEW_FORMAT])
+
+    def nntp_GROUP(self, arg):
+        """Handle the GROUP command."""
+        # pylint: disable=invalid-name
+        if arg != self.server.group:
+            self.reply("411 No such newsgroup")
+            return
+        self.group = True
+        count = len(self.server.msgids)
+        self.reply("211 {count} {first} {count} {group}".format(
+            count=count, first=1 if count else 0, group=self.server.group))
+
+    def nntp_ARTICLE(self, arg):
+        """Handle the ARTICLE command, by Message-ID or article number."""
+        # pylint: disable=invalid-name
+        if arg.startswith("<"):
+            msgid = arg
+            if msgid not in self.server.articles:
+                self.reply("430 No article with that message-id")
+                return
+            number = 0
+        else:
+            if not self.group:
+                self.reply("412 No newsgroup selected")
+                return
+            try:
+                number = int(arg)
+            except ValueError:
+                number = 0
+            if not 1 <= number <= len(self.server.msgids):
+                self.reply("423 No article with that number")
+                return
+            msgid = self.server.msgids[number - 1]
+        self.reply("220 {} {}".format(number, msgid),
+                   self.server.articles[msgid].splitlines())
+
+    def nntp_OVER(self, arg):
+        """Handle the OVER command for a range of article numbers."""
+        # pylint: disable=invalid-name
+        if not self.group:
+            self.reply("412 No newsgroup selected")
+            return
+        first, dash, last = arg.partition("-")
+        count = len(self.server.msgids)
+        try:
+            first = int(first)
+            last = int(last) if last else (count if dash else first)
+        except ValueError:
+            self.reply("501 Syntax error")
+            return
+        first = max(first, 1)
+        last = min(last, count)
+        if first > last:
+            self.reply("423 No articles in that range")
+            return
+        self.reply("224 Overview information follows", [
+            overview(number, self.server.articles[
+                self.server.msgids[number - 1]]).encode("utf-8", "replace")
+            for number in range(first, last + 1)])
+
+    nntp_XOVER = nntp_OVER
+
+    def nntp_QUIT(self, arg):
+        """Handle the QUIT command."""
+        # pylint: disable=invalid-name,unused-argument
+        self.reply("205 Bye")
+        return False
+
+
+class NewsServer(socketserver.ThreadingTCPServer):
+    """
+    An NNTP server serving the given (msgid, article bytes) pairs, in order,
+    as the articles of one group. If username is given then clients must
+    log in with it and password. Every reply is sent `latency` seconds
+    after its command was received.
+    """
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, articles, address=("127.0.0.1", 0),
+                 group="uk.net.news.announce", username=None, password=None,
+                 latency=0.0):
+        self.articles = {}
+        for msgid, article in articles:
+            self.articles.setdefault(msgid, article.replace(b"\r\n", b"\n"))
+        self.msgids = list(self.articles)
+        self.group = group
+        self.username = username
+        self.password = password
+        self.latency = latency
+        super().__init__(address, NewsHandler)
+
+    def url(self):
+        """Return the nntp: URL for connecting to this server."""
+        host, port = self.server_address[:2]
+        if self.username:
+            return "nntp://{}:{}@{}:{}".format(
+                self.username, self.password, host, port)
+        return "nntp://{}:{}".format(host, port)
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self.server_close()
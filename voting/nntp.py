@@ -1,6 +1,8 @@
 """nntp interface"""
 
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import nntplib
+import threading
 from urllib.parse import urlparse
 
 from django.core.exceptions import ImproperlyConfigured
@@ -8,6 +10,13 @@ from django.core.exceptions import ImproperlyConfigured
 from . import settings
 
 
+PIPELINE_DEPTH = 16
+
+# The responses meaning that the server does not have an article, as opposed
+# to errors with the connection or the server that are worth retrying soon.
+NO_SUCH_ARTICLE = ("423", "430")
+
+
 def connect(url=None):
     """Return an NNTP connection to the news server."""
     url = urlparse(url or settings.NEWS_SERVER)
@@ -24,3 +33,73 @@ def connect(url=None):
     if url.username:
         conn.login(url.username, url.password)
     return conn
+
+
+def pipelined_articles(conn, msgids):
+    """
+    Fetch several articles from one connection, sending all the ARTICLE
+    commands before reading any of the responses. Returns a list of
+    (msgid, response, lines), where lines is None if the article could not
+    be fetched.
+    """
+    # The commands are sent in a single write so that they are not held
+    # back by Nagle's algorithm waiting for each other to be acknowledged.
+    conn.file.write(b"".join(
+        "ARTICLE {}\r\n".format(msgid).encode(conn.encoding, conn.errors)
+        for msgid in msgids))
+    conn.file.flush()
+    # pylint: disable=protected-access
+    results = []
+    for msgid in msgids:
+        try:
+            response, lines = conn._getlongresp()
+        except (nntplib.NNTPTemporaryError,
+                nntplib.NNTPPermanentError) as exc:
+            results.append((msgid, exc.response, None))
+        else:
+            results.append((msgid, response, lines))
+    return results
+
+
+def fetch_articles(msgids, connections=4, url=None, depth=PIPELINE_DEPTH):
+    """
+    Fetch articles by Message-ID using a pool of concurrent connections,
+    each of which pipelines up to `depth` requests at a time.
+    Yields (msgid, response, lines) as the articles arrive, where lines is
+    None if the article could not be fetched. If that was because of an
+    error with the connection, the response starts with "Error:".
+    """
+    msgids = list(msgids)
+    if not msgids:
+        return
+    local = threading.local()
+    opened = []
+    lock = threading.Lock()
+
+    def fetch(chunk):
+        """Fetch a chunk of articles on this thread's connection."""
+        if getattr(local, "conn", None) is None:
+            local.conn = connect(url)
+            with lock:
+                opened.append(local.conn)
+        try:
+            return pipelined_articles(local.conn, chunk)
+        except (OSError, EOFError, nntplib.NNTPError) as exc:
+            local.conn = None
+            return [(msgid, "Error: {}".format(exc), None)
+                    for msgid in chunk]
+
+    try:
+        with ThreadPoolExecutor(max_workers=connections) as executor:
+            futures = [
+                executor.submit(fetch, msgids[start:start + depth])
+                for start in range(0, len(msgids), depth)
+            ]
+            for future in as_completed(futures):
+                yield from future.result()
+    finally:
+        for conn in opened:
+            try:
+                conn.quit()
+            except (OSError, EOFError, nntplib.NNTPError):
+                pass
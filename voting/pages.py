@@ -0,0 +1,101 @@
+"""
+Pre-rendered result and statement pages.
+Results and statements hardly ever change once their articles have been
+fetched, so their pages are rendered when they are saved and stored as
+RenderedPages, which the views serve directly if they exist. They are
+rendered outside any request, so URLs in them are made with the script
+prefix VOTING_SCRIPT_PREFIX (by default FORCE_SCRIPT_NAME, or "/"), which
+must be set if the site is not at the root of its domain.
+"""
+
+import hashlib
+
+from django.template.loader import render_to_string
+from django.urls import get_script_prefix, set_script_prefix
+
+from .articles import parsed_article
+from .models import Election, RenderedPage, Statement
+from . import settings
+
+
+RESULT_TEMPLATE = "voting/result_detail.html"
+STATEMENT_TEMPLATE = "voting/statement_detail.html"
+
+
+def result_context(election):
+    """Return the template context for an election's result page."""
+    message, body = parsed_article(election, "result")
+    return {
+        "object": election,
+        "election": election,
+        "message": message,
+        "body": body,
+    }
+
+
+def statement_context(statement):
+    """Return the template context for a statement's page."""
+    message, body = parsed_article(statement, "statement")
+    return {
+        "object": statement,
+        "statement": statement,
+        "message": message,
+        "body": body,
+    }
+
+
+def _digest(text):
+    """Return the hex SHA-256 digest of some text."""
+    return hashlib.sha256(text.encode("utf-8", "surrogatepass")).hexdigest()
+
+
+def _store(field, obj, template, context, article):
+    """Render and store the page for obj, with the digests of its content."""
+    prefix = get_script_prefix()
+    set_script_prefix(settings.SCRIPT_PREFIX)
+    try:
+        html = render_to_string(template, context)
+    finally:
+        set_script_prefix(prefix)
+    RenderedPage.objects.update_or_create(
+        **{field: obj}, defaults={
+            "html": html,
+            "html_digest": _digest(html),
+            "article_digest": _digest(article),
+        })
+
+
+def render_result(election):
+    """
+    Store the rendered result page for an election, or delete it if the
+    election has no public result page.
+    """
+    if election.status != Election.RESULT:
+        RenderedPage.objects.filter(election=election).delete()
+        return
+    _store("election", election, RESULT_TEMPLATE, result_context(election),
+           election.result)
+
+
+def render_statement(statement):
+    """Store the rendered page for a statement."""
+    _store("statement", statement, STATEMENT_TEMPLATE,
+           statement_context(statement), statement.statement)
+
+
+def render_all():
+    """
+    Render the pages for all the results and statements, e.g. after the
+    templates have changed. Returns the number of pages rendered.
+    """
+    RenderedPage.objects.filter(election__isnull=False).exclude(
+        election__status=Election.RESULT).delete()
+    count = 0
+    for election in Election.objects.filter(
+            status=Election.RESULT).defer("proposal", "cfv").iterator():
+        render_result(election)
+        count += 1
+    for statement in Statement.objects.iterator():
+        render_statement(statement)
+        count += 1
+    return count
@@ -1,7 +1,33 @@
 """voting settings."""
 
+import os
+
 from django.conf import settings
 
 
 NEWS_SERVER = getattr(settings, "VOTING_NEWS_SERVER", "")
+OLD_ARTICLES = getattr(
+    settings, "VOTING_OLD_ARTICLES",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                 "old-articles"))
+ANNOUNCE_GROUP = getattr(
+    settings, "VOTING_ANNOUNCE_GROUP", "uk.net.news.announce")
+DISCOVERY_LIMIT = getattr(settings, "VOTING_DISCOVERY_LIMIT", 10000)
+NEWS_RETRY_DELAY = getattr(settings, "VOTING_NEWS_RETRY_DELAY", 3600)
+NEWS_MAX_RETRY_DELAY = getattr(
+    settings, "VOTING_NEWS_MAX_RETRY_DELAY", 30 * 24 * 3600)
+ARTICLE_CACHE_SIZE = getattr(settings, "VOTING_ARTICLE_CACHE_SIZE", 256)
+SCRIPT_PREFIX = getattr(
+    settings, "VOTING_SCRIPT_PREFIX", settings.FORCE_SCRIPT_NAME or "/")
+VIEW_CACHE_TIMEOUT = getattr(settings, "VOTING_VIEW_CACHE_TIMEOUT", 24 * 3600)
+VIEW_CACHE_DATED_TIMEOUT = getattr(
+    settings, "VOTING_VIEW_CACHE_DATED_TIMEOUT", 3600)
 RECENT_DAYS = getattr(settings, "VOTING_RECENT_DAYS", 45)
+LMTP_DOMAINS = getattr(settings, "VOTING_LMTP_DOMAINS", {
+    "vote.ukvoting.org.uk": "vote",
+    "bounce.ukvoting.org.uk": "bounce",
+})
+QUEUE_MAIL = getattr(settings, "VOTING_QUEUE_MAIL", False)
+MAIL_RETRY_DELAY = getattr(settings, "VOTING_MAIL_RETRY_DELAY", 60)
+MAIL_MAX_ATTEMPTS = getattr(settings, "VOTING_MAIL_MAX_ATTEMPTS", 10)
+BOUNCE_LIMIT = getattr(settings, "VOTING_BOUNCE_LIMIT", 3)
@@ -0,0 +1,91 @@
+"""voting signal handlers."""
+
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import (
+    Ballot, Blob, Election, Email, Statement, Tally, Vote, Voter,
+    VoterIPAddress, Votetaker)
+from . import cache, pages
+
+
+@receiver(post_save, sender=Election)
+def election_saved(sender, instance, **kwargs):
+    """Re-render the result page for an election when it is saved."""
+    # pylint: disable=unused-argument
+    pages.render_result(instance)
+
+
+@receiver(post_save, sender=Statement)
+def statement_saved(sender, instance, **kwargs):
+    """Re-render the page for a statement when it is saved."""
+    # pylint: disable=unused-argument
+    pages.render_statement(instance)
+
+
+@receiver(post_save, sender=Election)
+@receiver(post_delete, sender=Election)
+def election_changed(sender, **kwargs):
+    """Invalidate the cached pages listing elections."""
+    # pylint: disable=unused-argument
+    cache.invalidate(cache.ELECTIONS)
+
+
+@receiver(post_save, sender=Statement)
+@receiver(post_delete, sender=Statement)
+def statement_changed(sender, **kwargs):
+    """Invalidate the cached pages listing statements."""
+    # pylint: disable=unused-argument
+    cache.invalidate(cache.STATEMENTS)
+
+
+@receiver(post_save, sender=Votetaker)
+@receiver(post_delete, sender=Votetaker)
+def votetaker_changed(sender, **kwargs):
+    """Invalidate the cached pages listing votetakers."""
+    # pylint: disable=unused-argument
+    cache.invalidate(cache.VOTETAKERS)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def user_saved(sender, instance, update_fields=None, **kwargs):
+    """
+    Invalidate the cached pages listing votetakers when a votetaker's user
+    (and so perhaps their name) changes, but not when they just log in.
+    """
+    # pylint: disable=unused-argument
+    if update_fields is not None and set(update_fields) == {"last_login"}:
+        return
+    if Votetaker.objects.filter(user_id=instance.pk).exists():
+        cache.invalidate(cache.VOTETAKERS)
+
+
+@receiver(post_save, sender=Vote)
+@receiver(post_delete, sender=Vote)
+def vote_changed(sender, instance, created=None, **kwargs):
+    """
+    Update the Tally when a Vote of an accepted voter is created or deleted,
+    including when it is deleted by cascade from its Voter. The voter's
+    Ballot for the question no longer matches their Votes, so it is deleted
+    and the question is counted from the Vote rows until it is repacked.
+    """
+    # pylint: disable=unused-argument
+    Ballot.objects.filter(
+        voter_id=instance.voter_id,
+        question__choice=instance.choice_id).delete()
+    if created is False:
+        return
+    if Voter.objects.filter(pk=instance.voter_id, accepted=True).exists():
+        Tally.adjust((instance.choice_id,), -1 if created is None else 1)
+
+
+@receiver(post_delete, sender=Email)
+@receiver(post_delete, sender=Voter)
+@receiver(post_delete, sender=VoterIPAddress)
+def blob_owner_deleted(sender, instance, **kwargs):
+    """Delete the Blobs a deleted object referred to, if now unused."""
+    # pylint: disable=unused-argument
+    Blob.delete_unreferenced(
+        getattr(instance, field.attname) for field in Blob.references()
+        if field.model is sender)
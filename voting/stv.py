@@ -0,0 +1,133 @@
+"""Single transferable vote counting."""
+
+from array import array
+
+
+class Round:
+    """One round of an STV count."""
+
+    def __init__(self, number, tallies, exhausted, action):
+        self.number = number
+        self.tallies = tallies
+        self.exhausted = exhausted
+        self.action = action
+
+
+class Result:
+    """The result of an STV count, with its round-by-round log."""
+
+    def __init__(self, choices, seats, ballots, quota):
+        self.choices = choices
+        self.seats = seats
+        self.ballots = ballots
+        self.quota = quota
+        self.elected = []
+        self.excluded = []
+        self.rounds = []
+
+    def winners(self):
+        """Return the list of elected choice indexes, in order of election."""
+        return list(self.elected)
+
+    def __str__(self):
+        lines = [
+            "Ballots: {}".format(self.ballots),
+            "Seats: {}".format(self.seats),
+            "Quota: {}".format(self.quota),
+            "",
+        ]
+        lines.extend(
+            "{:>3}: {}".format(i + 1, choice)
+            for i, choice in enumerate(self.choices)
+        )
+        for rnd in self.rounds:
+            lines.extend(("", "Round {}:".format(rnd.number)))
+            lines.extend(
+                "{:>3}  {:>10.2f}".format(i + 1, votes)
+                for i, votes in sorted(rnd.tallies.items())
+            )
+            lines.append("     {:>10.2f}  exhausted".format(rnd.exhausted))
+            lines.append(rnd.action)
+        lines.extend(("", "Elected:"))
+        lines.extend(
+            "{:>3}. {}".format(position, self.choices[i])
+            for position, i in enumerate(self.elected, 1)
+        )
+        return "\n".join(lines)
+
+
+def count(ballots, seats=1):
+    """
+    Count the given Ballots by STV, filling `seats` places, and return the
+    Result. The quota is the Droop quota and surpluses are transferred at a
+    fractional value. Each bundle of identical ballots carries a single
+    transfer value and preference position, so whole bundles are moved from
+    one choice to the next in each round. If there are no ballots that rank
+    any choice then no one is elected.
+    """
+    size = len(ballots.choices)
+    rankings = ballots.rankings
+    offsets = ballots.offsets
+    weights = ballots.weights
+    bundles = len(weights)
+    values = array("d", (1.0,)) * bundles
+    positions = array("I", offsets[:bundles])
+    valid = sum(weight for bundle, weight in enumerate(weights)
+                if offsets[bundle] < offsets[bundle + 1])
+    result = Result(ballots.choices, seats, valid, valid // (seats + 1) + 1)
+    if not valid:
+        return result
+    continuing = set(range(size))
+    previous = None
+
+    def advance(bundle):
+        """Move the bundle on to its next continuing preference."""
+        position = positions[bundle]
+        end = offsets[bundle + 1]
+        while position < end and rankings[position] not in continuing:
+            position += 1
+        positions[bundle] = position
+
+    while continuing and len(result.elected) < seats:
+        tallies = dict.fromkeys(continuing, 0.0)
+        piles = {choice: [] for choice in continuing}
+        exhausted = 0.0
+        for bundle in range(bundles):
+            advance(bundle)
+            votes = weights[bundle] * values[bundle]
+            if positions[bundle] < offsets[bundle + 1]:
+                choice = rankings[positions[bundle]]
+                tallies[choice] += votes
+                piles[choice].append(bundle)
+            else:
+                exhausted += votes
+        if len(continuing) <= seats - len(result.elected):
+            chosen = sorted(continuing, key=lambda i: -tallies[i])
+            result.elected.extend(chosen)
+            continuing.clear()
+            action = "Elected {} to fill the remaining seats.".format(
+                ", ".join(ballots.choices[i] for i in chosen))
+        else:
+            highest = max(continuing, key=lambda i: (tallies[i], -i))
+            if tallies[highest] >= result.quota:
+                result.elected.append(highest)
+                continuing.discard(highest)
+                surplus = tallies[highest] - result.quota
+                for bundle in piles[highest]:
+                    values[bundle] *= surplus / tallies[highest]
+                action = "Elected {}, transferring surplus of {:.2f}.".format(
+                    ballots.choices[highest], surplus)
+            else:
+                lowest = min(continuing, key=lambda i: (
+                    tallies[i],
+                    previous[i] if previous and i in previous else 0,
+                    -i,
+                ))
+                result.excluded.append(lowest)
+                continuing.discard(lowest)
+                action = "Excluded {}, transferring {:.2f}.".format(
+                    ballots.choices[lowest], tallies[lowest])
+        result.rounds.append(
+            Round(len(result.rounds) + 1, tallies, exhausted, action))
+        previous = tallies
+    return result
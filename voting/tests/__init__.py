@@ -0,0 +1,11 @@
+"""voting tests."""
+
+from voting.ballots import Ballots
+
+
+def ballots(choices, groups):
+    """Return the Ballots for a list of (count, ranking) groups."""
+    result = Ballots(choices)
+    for count, ranking in groups:
+        result.add(ranking, count)
+    return result
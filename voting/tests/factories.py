@@ -0,0 +1,32 @@
+"""Factories for the model instances used by the voting tests."""
+
+from voting.models import Choice, Election, Question, Voter
+
+
+def create_question(choices, method=Question.CONDORCET):
+    """
+    Return a new question, in a new election, with a choice for each of the
+    given names.
+    """
+    election = Election.objects.create(
+        title="Test", shortname="test", votetype="Procedural")
+    question = Question.objects.create(
+        election=election, question="Which?", method=method)
+    for choice in choices:
+        Choice.objects.create(question=question, choice=choice)
+    return question
+
+
+def create_voters(election, rankings):
+    """
+    Return a new accepted voter in the election for each of the given lists
+    of choices, with those as their votes.
+    """
+    voters = []
+    for n, ranking in enumerate(rankings):
+        voter = Voter.objects.create(
+            election=election, accepted=True, email_headers="",
+            email="voter{}@example.com".format(n))
+        voter.set_votes(ranking)
+        voters.append(voter)
+    return voters
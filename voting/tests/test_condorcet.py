@@ -0,0 +1,65 @@
+"""Known-answer tests for Condorcet (Schulze) counting."""
+
+import unittest
+
+from voting import condorcet
+from voting.tests import ballots
+
+
+A, B, C, D, E = range(5)
+
+
+class SchulzeTest(unittest.TestCase):
+    """Tests for the Schulze method."""
+
+    def test_wikipedia_example(self):
+        """The 45-voter example from the Wikipedia 'Schulze method' page."""
+        result = condorcet.count(ballots("ABCDE", (
+            (5, (A, C, B, E, D)),
+            (5, (A, D, E, C, B)),
+            (8, (B, E, D, A, C)),
+            (3, (C, A, B, E, D)),
+            (7, (C, A, E, B, D)),
+            (2, (C, B, A, D, E)),
+            (7, (D, C, E, B, A)),
+            (8, (E, B, A, D, C)),
+        )))
+        self.assertEqual(result.ballots, 45)
+        self.assertEqual(result.matrix, [
+            [0, 20, 26, 30, 22],
+            [25, 0, 16, 33, 18],
+            [19, 29, 0, 17, 24],
+            [15, 12, 28, 0, 14],
+            [23, 27, 21, 31, 0],
+        ])
+        self.assertEqual(result.paths, [
+            [0, 28, 28, 30, 24],
+            [25, 0, 28, 33, 24],
+            [25, 29, 0, 29, 24],
+            [25, 28, 28, 0, 24],
+            [25, 28, 28, 31, 0],
+        ])
+        self.assertEqual(result.ranking(), [[E], [A], [C], [B], [D]])
+        self.assertEqual(result.winners(), [E])
+
+    def test_tie(self):
+        """Evenly split ballots give a tie for first place."""
+        result = condorcet.count(ballots("ABC", (
+            (2, (A, B, C)),
+            (2, (B, A, C)),
+        )))
+        self.assertEqual(result.ranking(), [[A, B], [C]])
+        self.assertEqual(result.winners(), [A, B])
+
+    def test_unranked_choices(self):
+        """Choices a voter did not rank are treated as equal last."""
+        result = condorcet.count(ballots("ABC", (
+            (3, (C,)),
+            (2, (A, B)),
+        )))
+        self.assertEqual(result.matrix, [
+            [0, 2, 2],
+            [0, 0, 2],
+            [3, 3, 0],
+        ])
+        self.assertEqual(result.winners(), [C])
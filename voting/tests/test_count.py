@@ -0,0 +1,69 @@
+"""Tests for loading ranked ballots from the database."""
+
+from django.test import TestCase
+
+from voting.count import load_ballots, load_election_ballots
+from voting.models import Ballot, Vote
+from voting.tests.factories import create_question, create_voters
+
+
+class LoadBallotsTest(TestCase):
+    """Tests for counting from packed Ballots or from Vote rows."""
+
+    def setUp(self):
+        self.question = create_question("ABC")
+        self.election = self.question.election
+        self.choices = list(self.question.choice_set.order_by("id"))
+        self.voters = create_voters(self.election, [self.choices] * 3)
+        Ballot.pack(self.election)
+
+    def rankings(self):
+        """
+        Return the sorted (choices, weight) pairs loaded for the question,
+        checking that both ways of loading them agree.
+        """
+        loaded = [
+            sorted(("".join(ballots.choices[index] for index in ranking),
+                    weight) for ranking, weight in ballots)
+            for ballots in (load_ballots(self.question),
+                            load_election_ballots(
+                                self.election)[self.question.id])]
+        self.assertEqual(loaded[0], loaded[1])
+        return loaded[0]
+
+    def test_packed(self):
+        """The packed Ballots give the same rankings as the votes."""
+        self.assertEqual(self.rankings(), [("ABC", 3)])
+
+    def test_set_votes(self):
+        """Setting a voter's votes repacks their Ballot."""
+        self.voters[0].set_votes(self.choices[::-1])
+        self.assertEqual(
+            Ballot.objects.get(voter=self.voters[0]).choice_ids(),
+            [choice.id for choice in self.choices[::-1]])
+        self.assertEqual(self.rankings(), [("ABC", 2), ("CBA", 1)])
+
+    def test_vote_changed(self):
+        """Changing a Vote row directly makes the count use the votes."""
+        Vote.objects.filter(
+            voter=self.voters[0], choice=self.choices[0]).delete()
+        self.assertFalse(Ballot.objects.filter(voter=self.voters[0]).exists())
+        self.assertEqual(self.rankings(), [("ABC", 2), ("BC", 1)])
+
+    def test_choice_deleted(self):
+        """Deleting a choice after packing does not break the count."""
+        self.choices[1].delete()
+        self.choices.pop(1)
+        self.assertEqual(self.rankings(), [("AC", 3)])
+
+    def test_stale_packed_ranking(self):
+        """A packed ranking of a choice that does not exist is ignored."""
+        Ballot.objects.filter(voter=self.voters[0]).update(
+            ranking=bytes(4))
+        self.assertEqual(self.rankings(), [("ABC", 3)])
+
+    def test_unpack(self):
+        """Unpacking rebuilds the Vote rows and keeps the Ballots."""
+        self.assertEqual(Ballot.unpack(self.election), 9)
+        self.assertEqual(Ballot.objects.count(), 3)
+        self.assertEqual(self.rankings(), [("ABC", 3)])
@@ -0,0 +1,59 @@
+"""Tests for the LMTP server."""
+
+import socket
+import threading
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from voting import lmtp
+
+
+class LMTPTest(SimpleTestCase):
+    """Tests for the LMTP server's handling of sessions and message data."""
+
+    def setUp(self):
+        self.delivered = []
+        for name, function in (
+                ("find_election", lambda name: None),
+                ("handle", lambda *args: self.delivered.append(args[3]))):
+            patcher = mock.patch.object(lmtp.mail, name, function)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.server = lmtp.LMTPServer(("localhost", 0))
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(thread.join)
+        self.addCleanup(self.server.shutdown)
+
+    def deliver(self, raw_msg):
+        """Deliver a message and return the reply for its recipient."""
+        return lmtp.deliver(
+            self.server.server_address, "sender@example.com",
+            ["test@vote.ukvoting.org.uk"], raw_msg)[0][1]
+
+    def test_long_line_dots(self):
+        """A dot after the first 1000 bytes of a line is not unstuffed."""
+        body = b"x" * 1000 + b".yy\n.\n..z\n"
+        self.assertTrue(self.deliver(b"Subject: Test\n\n" + body
+                                     ).startswith("250"))
+        self.assertEqual(self.delivered, [b"Subject: Test\n\n" + body])
+
+    def test_too_long_line(self):
+        """A line that is longer than the limit is rejected, not split."""
+        reply = self.deliver(
+            b"Subject: Test\n\n" + b"x" * lmtp.MAX_DATA_LINE_LENGTH + b"\n")
+        self.assertTrue(reply.startswith("500 5.5.2"), reply)
+        self.assertEqual(self.delivered, [])
+
+    def test_idle_timeout(self):
+        """Idle sessions are closed, so that others can be handled."""
+        with mock.patch.object(lmtp.LMTPHandler, "timeout", 0.2), \
+                socket.create_connection(self.server.server_address) as sock:
+            with sock.makefile("rb") as rfile:
+                self.assertTrue(rfile.readline().startswith(b"220"))
+                self.assertTrue(rfile.readline().startswith(b"421"))
+                self.assertEqual(rfile.readline(), b"")
+            self.assertTrue(self.deliver(b"Subject: Test\n\nBody\n"
+                                         ).startswith("250"))
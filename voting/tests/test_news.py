@@ -0,0 +1,161 @@
+"""Tests for fetching news articles, against the stand-in news server."""
+
+import datetime
+from io import StringIO
+import nntplib
+import tempfile
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+
+from voting import nntp, settings
+from voting.models import ArticleFetch, Election, NewsGroup, Statement
+from voting.newsserver import NewsServer
+
+
+def article(msgid, subject, body="Some text.\n"):
+    """Return (msgid, article bytes) for a test article."""
+    return msgid, "\n".join([
+        "From: votetaker@example.com",
+        "Newsgroups: uk.net.news.announce",
+        "Subject: " + subject,
+        "Date: Sat, 03 Oct 2026 12:00:00 +0000",
+        "Message-ID: " + msgid,
+        "",
+        body,
+    ]).encode("ascii")
+
+
+ARTICLES = [
+    article("<art{}@example.com>".format(n), "Article {}".format(n),
+            ".dotted line {}\n".format(n))
+    for n in range(20)
+]
+
+
+class FetchArticlesTest(SimpleTestCase):
+    """Tests for nntp.fetch_articles."""
+
+    def test_pipelined_with_misses(self):
+        """
+        Articles the server does not have are reported with its 430
+        response, without upsetting the pipelined responses after them.
+        """
+        msgids = []
+        for n, (msgid, _) in enumerate(ARTICLES):
+            msgids.append(msgid)
+            if n % 3 == 0:
+                msgids.append("<missing{}@example.com>".format(n))
+        with NewsServer(ARTICLES) as server:
+            results = {
+                msgid: (response, lines)
+                for msgid, response, lines in nntp.fetch_articles(
+                    msgids, connections=2, url=server.url(), depth=4)}
+        self.assertEqual(set(results), set(msgids))
+        for n, (msgid, content) in enumerate(ARTICLES):
+            response, lines = results[msgid]
+            self.assertTrue(response.startswith("220"), response)
+            self.assertEqual(b"\n".join(lines), content.rstrip(b"\n"))
+            if n % 3 == 0:
+                response, lines = results["<missing{}@example.com>".format(n)]
+                self.assertIsNone(lines)
+                self.assertTrue(response.startswith("430"), response)
+
+    def test_authinfo(self):
+        """Articles are fetched after logging in with AUTHINFO."""
+        with NewsServer(ARTICLES, username="user",
+                        password="secret") as server:
+            results = list(nntp.fetch_articles(
+                [ARTICLES[0][0]], url=server.url()))
+            self.assertEqual(len(results), 1)
+            self.assertIsNotNone(results[0][2])
+            with self.assertRaises(nntplib.NNTPError):
+                list(nntp.fetch_articles(
+                    [ARTICLES[0][0]],
+                    url=server.url().replace(":secret@", ":wrong@")))
+
+
+class FetchVotingNewsTest(TestCase):
+    """Tests for the fetchvotingnews command."""
+
+    def setUp(self):
+        self.old_articles = tempfile.TemporaryDirectory()
+        self.addCleanup(self.old_articles.cleanup)
+        self.statement = Statement.objects.create(
+            title="Statement", slug="statement",
+            release_date=datetime.date(2026, 10, 1),
+            msgid=ARTICLES[0][0])
+        self.election = Election.objects.create(
+            title="uk.test.fetched", votetype="Procedural",
+            status=Election.RESULT, result_msgid=ARTICLES[1][0])
+        self.missing = Election.objects.create(
+            title="uk.test.missing", votetype="Procedural",
+            status=Election.RESULT, result_msgid="<missing@example.com>")
+
+    def fetch(self, server, *args, **options):
+        """Run fetchvotingnews against server and return its output."""
+        stdout = StringIO()
+        with mock.patch.object(settings, "NEWS_SERVER", server.url()), \
+                mock.patch.object(settings, "OLD_ARTICLES",
+                                  self.old_articles.name):
+            call_command("fetchvotingnews", *args, stdout=stdout,
+                         connections=2, batch_size=1, **options)
+        return stdout.getvalue()
+
+    def test_fetch(self):
+        """Articles are saved, and missing ones are backed off."""
+        with NewsServer(ARTICLES) as server:
+            self.fetch(server)
+        self.statement.refresh_from_db()
+        self.election.refresh_from_db()
+        self.assertEqual(self.statement.statement.encode("ascii"),
+                         ARTICLES[0][1].rstrip(b"\n"))
+        self.assertIn("Subject: Article 1", self.election.result)
+        fetch = ArticleFetch.objects.get()
+        self.assertEqual(fetch.msgid, "<missing@example.com>")
+        self.assertEqual(fetch.attempts, 1)
+        self.assertTrue(fetch.response.startswith("430"))
+        self.assertEqual(
+            fetch.next_attempt - fetch.last_attempt,
+            datetime.timedelta(seconds=settings.NEWS_RETRY_DELAY))
+
+    def test_backoff(self):
+        """Missing articles are not retried until they are due, or forced."""
+        with NewsServer(ARTICLES) as server:
+            self.fetch(server)
+            output = self.fetch(server)
+            self.assertIn("Skipping 1 articles", output)
+            self.assertEqual(ArticleFetch.objects.get().attempts, 1)
+            self.fetch(server, force=True)
+        fetch = ArticleFetch.objects.get()
+        self.assertEqual(fetch.attempts, 2)
+        self.assertEqual(
+            fetch.next_attempt - fetch.last_attempt,
+            datetime.timedelta(seconds=2 * settings.NEWS_RETRY_DELAY))
+
+    def test_authinfo(self):
+        """The command logs in to a server that requires it."""
+        with NewsServer(ARTICLES, username="user",
+                        password="secret") as server:
+            self.fetch(server)
+        self.election.refresh_from_db()
+        self.assertIn("Subject: Article 1", self.election.result)
+
+    def test_discover(self):
+        """Postings found by --discover are fetched in the same run."""
+        election = Election.objects.create(
+            title="uk.test.discovered", votetype="Procedural",
+            status=Election.ACTIVE)
+        cfv = article("<cfv@example.com>", "CFV: uk.test.discovered",
+                      "Vote now.\n")
+        with NewsServer(ARTICLES + [
+                article("<bad message id>", "CFV: uk.test.discovered"),
+                cfv]) as server:
+            output = self.fetch(server, discover=True)
+        self.assertIn("Found cfv <cfv@example.com>", output)
+        election.refresh_from_db()
+        self.assertEqual(election.cfv_msgid, "<cfv@example.com>")
+        self.assertIn("Vote now.", election.cfv)
+        self.assertEqual(NewsGroup.objects.get().high_water,
+                         len(ARTICLES) + 2)
@@ -0,0 +1,70 @@
+"""Known-answer tests for single transferable vote counting."""
+
+import unittest
+
+from voting import stv
+from voting.ballots import Ballots
+from voting.tests import ballots
+
+
+A, B, C, D = range(4)
+
+
+class STVTest(unittest.TestCase):
+    """Tests for STV counting."""
+
+    def test_no_ballots(self):
+        """With no ballots no one is elected."""
+        result = stv.count(Ballots("ABC"), seats=2)
+        self.assertEqual(result.ballots, 0)
+        self.assertEqual(result.winners(), [])
+        self.assertEqual(result.rounds, [])
+
+    def test_empty_ballots(self):
+        """Ballots that rank no choices do not elect anyone."""
+        result = stv.count(ballots("AB", ((3, ()),)))
+        self.assertEqual(result.ballots, 0)
+        self.assertEqual(result.winners(), [])
+
+    def test_surplus_transfer(self):
+        """
+        A's surplus of 2 over the quota of 6 moves to B at a fractional
+        value, lifting B above C, who would otherwise have won.
+        """
+        result = stv.count(ballots("ABC", (
+            (8, (A, B)),
+            (3, (B,)),
+            (4, (C,)),
+        )), seats=2)
+        self.assertEqual(result.ballots, 15)
+        self.assertEqual(result.quota, 6)
+        self.assertEqual(result.rounds[0].tallies, {A: 8.0, B: 3.0, C: 4.0})
+        self.assertEqual(result.rounds[1].tallies, {B: 5.0, C: 4.0})
+        self.assertEqual(result.excluded, [C])
+        self.assertEqual(result.winners(), [A, B])
+
+    def test_elimination_tie_previous_round(self):
+        """
+        A tie for last place is broken by the tallies of the previous round,
+        so C, who had fewer votes there, is excluded before B.
+        """
+        result = stv.count(ballots("ABCD", (
+            (6, (A,)),
+            (4, (B,)),
+            (3, (C,)),
+            (1, (D, C)),
+        )))
+        self.assertEqual(result.quota, 8)
+        self.assertEqual(result.rounds[1].tallies, {A: 6.0, B: 4.0, C: 4.0})
+        self.assertEqual(result.excluded, [D, C, B])
+        self.assertEqual(result.winners(), [A])
+
+    def test_elimination_tie_first_round(self):
+        """A tie for last in the first round excludes the later choice."""
+        result = stv.count(ballots("ABC", (
+            (2, (A,)),
+            (1, (B, A)),
+            (1, (C, B)),
+        )))
+        self.assertEqual(result.excluded[0], C)
+        self.assertEqual(result.rounds[1].tallies, {A: 2.0, B: 2.0})
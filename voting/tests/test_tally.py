@@ -0,0 +1,42 @@
+"""Tests for the running vote tally."""
+
+from django.test import TestCase
+
+from voting.models import Tally, Voter
+from voting.tests.factories import create_question, create_voters
+
+
+class TallyTest(TestCase):
+    """Tests for keeping the Tally in step with the votes."""
+
+    def setUp(self):
+        question = create_question("AB")
+        self.election = question.election
+        self.choices = list(question.choice_set.order_by("id"))
+        create_voters(self.election, (self.choices[n % 2:] for n in range(3)))
+
+    def tallies(self):
+        """Return the tallies of the choices, in choice order."""
+        return [Tally.objects.filter(choice=choice).values_list(
+            "votes", flat=True).first() for choice in self.choices]
+
+    def test_set_votes(self):
+        """Votes set for accepted voters are tallied."""
+        self.assertEqual(self.tallies(), [2, 3])
+
+    def test_delete_voter(self):
+        """Deleting an accepted voter removes their votes from the tally."""
+        Voter.objects.filter(email="voter0@example.com").delete()
+        self.assertEqual(self.tallies(), [1, 2])
+
+    def test_delete_choice(self):
+        """A choice with accepted votes can be deleted."""
+        self.choices[0].delete()
+        self.assertFalse(Tally.objects.filter(
+            choice_id=self.choices[0].id).exists())
+        self.assertEqual(Tally.objects.get(choice=self.choices[1]).votes, 3)
+
+    def test_delete_election(self):
+        """An election with accepted votes can be deleted."""
+        self.election.delete()
+        self.assertFalse(Tally.objects.exists())
@@ -3,15 +3,124 @@
 # pylint: disable=too-many-ancestors
 
 import datetime
-import email
+import hashlib
 
-from django.db.models import Q
+from django.db.models import Count, Max, Q
 from django.http import Http404, HttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
 from django.views.generic import DetailView, ListView
 
-from .models import Election, Statement, Votetaker
+from .articles import parsed_article
+from .cache import ELECTIONS, STATEMENTS, VOTETAKERS, cached_view
+from .models import Election, RenderedPage, Statement, Votetaker
+
+
+def _etag(*parts):
+    """Return an ETag made from a hash of the given values."""
+    return hashlib.sha256(
+        "\0".join(str(part) for part in parts).encode("utf-8")
+    ).hexdigest()[:32]
+
+
+def _changes(request, model):
+    """
+    Return (row count, latest modification time) for a model's table. It is
+    queried once per request, as both the ETag and Last-Modified functions
+    need it.
+    """
+    changes = vars(request).setdefault("voting_changes", {})
+    if model not in changes:
+        totals = model.objects.aggregate(
+            count=Count("pk"), latest=Max("modified"))
+        changes[model] = totals["count"], totals["latest"]
+    return changes[model]
+
+
+def _votetaker_names():
+    """
+    Return the votetakers' user names and full names, as shown on the pages
+    listing elections. Users have no modification time, so the ETags of
+    those pages include these instead.
+    """
+    return list(Votetaker.objects.order_by("pk").values_list(
+        "pk", "user__username", "user__first_name", "user__last_name"))
+
+
+def _result_pages(key):
+    """Return a queryset of the rendered page for a result, by id or name."""
+    pages = RenderedPage.objects.filter(election__status=Election.RESULT)
+    if key.isdigit():
+        return pages.filter(election_id=int(key))
+    return pages.filter(election__shortname=key)
+
+
+def _result_modified(request, key=None):
+    """Return the Last-Modified time of a result."""
+    results = Election.objects.filter(status=Election.RESULT)
+    if key.isdigit():
+        results = results.filter(id=int(key))
+    else:
+        results = results.filter(shortname=key)
+    return results.values_list("modified", flat=True).first()
+
+
+def _result_etag(request, key=None):
+    """Return the ETag of a result page, if it has been rendered."""
+    return _result_pages(key).values_list("html_digest", flat=True).first()
+
+
+def _result_raw_etag(request, key=None):
+    """Return the ETag of a raw result, if its page has been rendered."""
+    return _result_pages(key).values_list(
+        "article_digest", flat=True).first()
+
+
+def _statement_modified(request, release_date=None, slug=None):
+    """Return the Last-Modified time of a statement."""
+    return Statement.objects.filter(
+        release_date=release_date, slug=slug).values_list(
+            "modified", flat=True).first()
+
+
+def _statement_etag(request, release_date=None, slug=None):
+    """Return the ETag of a statement page, if it has been rendered."""
+    return RenderedPage.objects.filter(
+        statement__release_date=release_date, statement__slug=slug
+    ).values_list("html_digest", flat=True).first()
+
+
+def _statement_raw_etag(request, release_date=None, slug=None):
+    """Return the ETag of a raw statement, if its page has been rendered."""
+    return RenderedPage.objects.filter(
+        statement__release_date=release_date, statement__slug=slug
+    ).values_list("article_digest", flat=True).first()
+
+
+def _results_etag(request, *args, **kwargs):
+    """Return the ETag of the page listing results."""
+    return _etag(*_changes(request, Election), *_votetaker_names())
+
+
+def _statements_etag(request, *args, **kwargs):
+    """Return the ETag of the page listing statements."""
+    return _etag(*_changes(request, Statement))
+
+
+def _statements_modified(request, *args, **kwargs):
+    """Return the Last-Modified time of the page listing statements."""
+    return _changes(request, Statement)[1]
+
+
+def _daily(midnight, latest):
+    """
+    Return the Last-Modified time of a page that also depends on the date:
+    the latest modification time or the start of the day, whichever is
+    later.
+    """
+    return max(latest, midnight) if latest else midnight
 
 
 def home(request):
@@ -19,6 +128,7 @@ def home(request):
     return render(request, "voting/home.html", {})
 
 
+@cached_view(VOTETAKERS)
 def votetakers(request):
     """List the votetakers."""
     return render(
@@ -31,15 +141,31 @@ def votetakers(request):
     )
 
 
+@method_decorator(cached_view(STATEMENTS), name="dispatch")
+@method_decorator(condition(
+    etag_func=_statements_etag, last_modified_func=_statements_modified),
+    name="get")
 class StatementList(ListView):
     """List the statements."""
     model = Statement
 
 
+@method_decorator(condition(
+    etag_func=_statement_etag, last_modified_func=_statement_modified),
+    name="get")
 class StatementView(DetailView):
-    """View a statement."""
+    """View a statement, using the pre-rendered page if there is one."""
     model = Statement
 
+    def get(self, request, *args, **kwargs):
+        html = RenderedPage.objects.filter(
+            statement__release_date=self.kwargs["release_date"],
+            statement__slug=self.kwargs["slug"],
+        ).values_list("html", flat=True).first()
+        if html is not None:
+            return HttpResponse(html)
+        return super().get(request, *args, **kwargs)
+
     def get_object(self, queryset=None):
         if queryset is None:
             queryset = self.get_queryset()
@@ -53,20 +179,21 @@ class StatementView(DetailView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        message = email.message_from_string(self.object.statement)
-        context["message"] = message
-        context["body"] = message.get_payload()
+        context["message"], context["body"] = parsed_article(
+            self.object, "statement")
         return context
 
 
+@condition(etag_func=_statement_raw_etag,
+           last_modified_func=_statement_modified)
 def statement_raw(request, release_date=None, slug=None):
     """Return the raw text of a statement."""
     return HttpResponse(
         get_object_or_404(
-            Statement,
+            Statement.objects.values_list("statement", flat=True),
             release_date=release_date,
             slug=slug
-            ).statement,
+            ),
         content_type="text/plain; charset=utf-8"
     )
 
@@ -82,8 +209,14 @@ def statement_by_msgid(request, msgid=None):
     )
 
 
+@method_decorator(cached_view(
+    ELECTIONS, VOTETAKERS, params=("non-uk", "votetaker")), name="dispatch")
+@method_decorator(condition(etag_func=_results_etag), name="get")
 class ResultList(ListView):
-    """List the election results."""
+    """
+    List the election results. This has no Last-Modified time, as the
+    votetakers' names shown on it can change without one.
+    """
     model = Election
     template_name = "voting/result_list.html"
 
@@ -102,15 +235,25 @@ class ResultList(ListView):
         return queryset
 
 
+@method_decorator(condition(
+    etag_func=_result_etag, last_modified_func=_result_modified), name="get")
 class ResultView(DetailView):
-    """View an election result."""
+    """View an election result, using the pre-rendered page if there is one."""
     model = Election
     template_name = "voting/result_detail.html"
 
+    def get(self, request, *args, **kwargs):
+        html = _result_pages(self.kwargs["key"]).values_list(
+            "html", flat=True).first()
+        if html is not None:
+            return HttpResponse(html)
+        return super().get(request, *args, **kwargs)
+
     def get_object(self, queryset=None):
         if queryset is None:
             queryset = self.get_queryset()
-        queryset = queryset.filter(status=Election.RESULT)
+        queryset = queryset.filter(status=Election.RESULT).defer(
+            "proposal", "cfv")
         try:
             if self.kwargs["key"].isdigit():
                 return queryset.get(id=int(self.kwargs["key"]))
@@ -120,9 +263,8 @@ class ResultView(DetailView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        message = email.message_from_string(self.object.result)
-        context["message"] = message
-        context["body"] = message.get_payload()
+        context["message"], context["body"] = parsed_article(
+            self.object, "result")
         return context
 
 
@@ -138,20 +280,41 @@ def result_by_msgid(request, msgid=None):
     )
 
 
+@condition(etag_func=_result_raw_etag, last_modified_func=_result_modified)
 def result_raw(request, key=None):
     """Return the raw text of a statement."""
+    results = Election.objects.filter(status=Election.RESULT).values_list(
+        "result", flat=True)
     if key.isdigit():
-        result = get_object_or_404(Election, status=Election.RESULT,
-                                   id=key).result
+        result = get_object_or_404(results, id=key)
     else:
-        result = get_object_or_404(Election, status=Election.RESULT,
-                                   shortname=key).result
+        result = get_object_or_404(results, shortname=key)
     return HttpResponse(result, content_type="text/plain; charset=utf-8")
 
 
+def _missing_cutoff():
+    """Return the date before which missing articles are listed."""
+    return (datetime.datetime.now() - datetime.timedelta(days=20)).date()
+
+
+def _missing_etag(request):
+    """Return the ETag of the missing articles page."""
+    return _etag(_missing_cutoff(), *_changes(request, Election))
+
+
+def _missing_modified(request):
+    """Return the Last-Modified time of the missing articles page."""
+    return _daily(
+        datetime.datetime.combine(
+            datetime.date.today(), datetime.time.min).astimezone(),
+        _changes(request, Election)[1])
+
+
+@cached_view(ELECTIONS, dated=_missing_cutoff)
+@condition(etag_func=_missing_etag, last_modified_func=_missing_modified)
 def missing(request):
     """View the list of missing files."""
-    cutoff = (datetime.datetime.now() - datetime.timedelta(days=20)).date()
+    cutoff = _missing_cutoff()
     results = Election.objects.exclude(hidden=True).exclude(
         result_date__gte=cutoff).filter(
             result="", status=Election.RESULT).order_by("-result_date")
@@ -168,8 +331,19 @@ def missing(request):
     )
 
 
+def _status_etag(request):
+    """Return the ETag of the status page."""
+    return _etag(timezone.now().date(), *_changes(request, Election),
+                 *_votetaker_names())
+
+
+@cached_view(ELECTIONS, VOTETAKERS, dated=lambda: timezone.now().date())
+@condition(etag_func=_status_etag)
 def status(request):
-    """View the list of currently-active CFVs."""
+    """
+    View the list of currently-active CFVs. This has no Last-Modified time,
+    as the votetakers' names shown on it can change without one.
+    """
     today = timezone.now().date()
     count = Election.objects.exclude(hidden=True).filter(
         Q(status=Election.COUNT) | Q(
@@ -189,6 +363,7 @@ def status(request):
     )
 
 
+@cached_view(VOTETAKERS)
 def pgpkeys(request):
     """View the list of votetakers' PGP keys."""
     return render(